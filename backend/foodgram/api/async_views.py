@@ -0,0 +1,87 @@
+"""Async read path of recipes, tags and ingredients endpoints.
+
+Django 3.2 has no async ORM and DRF has no async views, so under ASGI
+safe requests of these endpoints are served by an async view running
+the DRF view, ORM queries included, on a bounded thread pool. The event
+loop keeps accepting requests while queries are waiting for the DB,
+instead of Django handing every sync view to its single shared thread.
+Other methods keep the default Django behavior.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from core.connections import check_connections, mark_connections_used
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEWS['THREADS'],
+            thread_name_prefix='async-views',
+        )
+    return _executor
+
+
+def call_view(view, request, *args, **kwargs):
+    """Call the sync view and render its response in the pool thread."""
+    # Connections of pool threads live between requests, they are
+    # closed by the same rules as of the request thread connections.
+    close_old_connections()
+    check_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if response.streaming:
+            # Django iterates streaming content on the event loop,
+            # where lazy queries of the content are not allowed.
+            response.streaming_content = list(response.streaming_content)
+            return response
+        if not callable(getattr(response, 'render', None)):
+            return response
+        response.render()
+        # Django renders template responses in its shared sync
+        # thread, a plain response skips that switch.
+        rendered = HttpResponse(
+            response.content, status=response.status_code,
+            headers=response.headers
+        )
+        rendered.cookies = response.cookies
+        return rendered
+    finally:
+        close_old_connections()
+        mark_connections_used()
+
+
+def async_read(view):
+    """Make an async view running safe requests of the sync 'view'
+    on the pool of ASYNC_VIEWS['THREADS'] threads.
+    """
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            functools.partial(call_view, view, request, *args, **kwargs)
+        )
+    return async_view
+
+
+def async_read_urls(urlpatterns, basenames):
+    """Replace views of router URL patterns of 'basenames'
+    with async ones.
+    """
+    prefixes = tuple(f'{basename}-' for basename in basenames)
+    for pattern in urlpatterns:
+        if pattern.name and pattern.name.startswith(prefixes):
+            pattern.callback = async_read(pattern.callback)
+    return urlpatterns
@@ -0,0 +1,127 @@
+import csv
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from recipes.models import ShoppingCartIngredient
+
+FILENAME = 'shopping_list'
+ITERATOR_CHUNK_SIZE = 500
+
+
+def get_shopping_list_rows(user):
+    """Return iterator over (name, amount, measure) rows
+    of the user's shopping list.
+    """
+    return ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list(
+        'ingredient__name', 'amount', 'ingredient__measure'
+    ).order_by('ingredient__name').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+
+def attachment(response, extension):
+    response['Content-Disposition'] = (
+        f'attachment;filename="{FILENAME}.{extension}"'
+    )
+    return response
+
+
+def iter_txt(rows):
+    for index, row in enumerate(rows):
+        line = ' '.join(str(value) for value in row)
+        yield line if not index else '\n' + line
+
+
+class Echo:
+    """Pseudo-buffer that returns written value instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(['name', 'amount', 'measurement_unit'])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_txt(user):
+    return attachment(StreamingHttpResponse(
+        iter_txt(get_shopping_list_rows(user)),
+        content_type='text/plain'
+    ), 'txt')
+
+
+def export_csv(user):
+    return attachment(StreamingHttpResponse(
+        iter_csv(get_shopping_list_rows(user)),
+        content_type='text/csv'
+    ), 'csv')
+
+
+class ShoppingListPDFRenderer:
+    """Renders shopping list rows to the PDF document page by page."""
+    page_size = A4
+    margin = 50
+    title_size = 16
+    font_size = 12
+    line_height = 18
+    title = 'Список покупок'
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_font_name():
+        """Register TTF font with cyrillic glyphs once per process."""
+        font_path = settings.SHOPPING_LIST_FONT
+        if not os.path.exists(font_path):
+            return 'Helvetica'
+        pdfmetrics.registerFont(TTFont('ShoppingListFont', font_path))
+        return 'ShoppingListFont'
+
+    def render(self, rows, file):
+        font_name = self.get_font_name()
+        width, height = self.page_size
+        canvas = Canvas(file, pagesize=self.page_size)
+        canvas.setFont(font_name, self.title_size)
+        canvas.drawString(self.margin, height - self.margin, self.title)
+        y = height - self.margin - 2 * self.line_height
+        canvas.setFont(font_name, self.font_size)
+        for name, amount, measure in rows:
+            if y < self.margin:
+                canvas.showPage()
+                canvas.setFont(font_name, self.font_size)
+                y = height - self.margin
+            canvas.drawString(self.margin, y, f'• {name}')
+            canvas.drawRightString(
+                width - self.margin, y, f'{amount} {measure}'
+            )
+            y -= self.line_height
+        canvas.save()
+
+
+def export_pdf(user):
+    # Spooled file keeps small documents in memory and moves
+    # large ones to disk, FileResponse then streams it in chunks.
+    file = tempfile.SpooledTemporaryFile(
+        max_size=settings.SHOPPING_LIST_PDF_MAX_MEMORY_SIZE
+    )
+    ShoppingListPDFRenderer().render(get_shopping_list_rows(user), file)
+    file.seek(0)
+    return attachment(
+        FileResponse(file, content_type='application/pdf'), 'pdf'
+    )
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'pdf': export_pdf,
+}
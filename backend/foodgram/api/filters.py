@@ -1,35 +1,39 @@
+from django.db.models import F
 from django_filters import rest_framework as filters
 
-from recipes.models import Recipe, Ingredient, Tag
+from recipes.models import Recipe, Tag, get_tags_mask
+from recipes.search import search_recipes
 
 
 class RecipeFilter(filters.FilterSet):
-    author = filters.CharFilter(
-        field_name='author__id',
-        lookup_expr='icontains'
-    )
+    author = filters.NumberFilter(field_name='author')
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method='filter_tags'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = (
             'author',
-            'tags'
+            'tags',
+            'search'
         )
 
+    def filter_tags(self, queryset, name, value):
+        # Recipes having any of the tags, no join with tags needed.
+        if not value:
+            return queryset
+        return queryset.alias(
+            matched_tags=F('tags_mask').bitand(get_tags_mask(value))
+        ).exclude(matched_tags=0)
 
-class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
-    )
-
-    class Meta:
-        model = Ingredient
-        fields = (
-            'name',
+    def filter_search(self, queryset, name, value):
+        # Explicit 'ordering' query param still takes precedence.
+        return search_recipes(queryset, value).order_by(
+            '-search_rank', '-created', '-id'
         )
+
@@ -0,0 +1,147 @@
+import copy
+from abc import ABC, abstractmethod
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from core.versions import (CATALOGUE_VERSION, RECIPES_VERSION, get_version,
+                           version_etag, version_last_modified)
+from recipes.models import Recipe
+from users.models import User
+
+catalogue_condition = condition(
+    etag_func=version_etag(CATALOGUE_VERSION),
+    last_modified_func=version_last_modified(CATALOGUE_VERSION),
+)
+
+
+class ReadOnlyListMixin(ABC):
+    """List action representing objects by 'represent_list()' with
+    plain dicts instead of the serializer, for hot list endpoints.
+    """
+
+    @abstractmethod
+    def represent_list(self, objects):
+        """Return list of dicts with the same output as of the
+        serializer of the view.
+        """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.represent_list(page))
+        return Response(self.represent_list(queryset))
+
+
+class CatalogueCacheMixin:
+    """Conditional GET and per-version payload cache
+    for read-only catalogue viewsets (tags, ingredients).
+    """
+    _payloads = dict()
+
+    @method_decorator(catalogue_condition)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(catalogue_condition)
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        token = get_version(CATALOGUE_VERSION)[0]
+        cached = self._payloads.get(self.basename)
+        if cached is not None and cached[0] == token:
+            return Response(cached[1])
+        response = super().list(request, *args, **kwargs)
+        self._payloads[self.basename] = (token, response.data)
+        return response
+
+
+class RecipeCacheMixin:
+    """Cache of recipe list and detail responses shared by all users.
+
+    Responses are cached without per-user fields, for authenticated
+    users they are overlaid by three queries for recipes of the page.
+    Keys include RECIPES_VERSION bumped by recipes signals, see
+    RECIPE_CACHE_TTL setting for data that may be stale.
+    """
+    # Filters by per-user relations can't be shared.
+    user_query_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self, request):
+        if any(request.query_params.get(param)
+               for param in self.user_query_params):
+            return None
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        # Absolute URI is a part of the key, links in responses are
+        # built with host of the request.
+        url = request.build_absolute_uri(request.path)
+        return (
+            f'response:{RECIPES_VERSION}:'
+            f'{get_version(RECIPES_VERSION)[0]}:'
+            f'{md5(f"{url}?{params}".encode()).hexdigest()}'
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                data = copy.deepcopy(response.data)
+                self.reset_user_fields(self.get_recipes(data))
+                cache.set(key, data, settings.RECIPE_CACHE_TTL)
+            return response
+        if request.user.is_authenticated:
+            self.set_user_fields(self.get_recipes(data), request.user)
+        return Response(data)
+
+    @staticmethod
+    def get_recipes(data):
+        return data['results'] if 'results' in data else [data]
+
+    @staticmethod
+    def reset_user_fields(recipes):
+        for recipe in recipes:
+            recipe['is_favorited'] = False
+            recipe['is_in_shopping_cart'] = False
+            recipe['author']['is_subscribed'] = False
+
+    @staticmethod
+    def set_user_fields(recipes, user):
+        if not recipes:
+            return
+        recipe_ids = [recipe['id'] for recipe in recipes]
+        favorited = set(Recipe.favorited_users.through.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        in_shopping_cart = set(Recipe.shopping_users.through.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        subscribed = set(User.subscriptions.through.objects.filter(
+            from_user=user,
+            to_user_id__in={recipe['author']['id'] for recipe in recipes}
+        ).values_list('to_user_id', flat=True))
+        for recipe in recipes:
+            recipe['is_favorited'] = recipe['id'] in favorited
+            recipe['is_in_shopping_cart'] = recipe['id'] in in_shopping_cart
+            recipe['author']['is_subscribed'] = (
+                recipe['author']['id'] in subscribed
+            )
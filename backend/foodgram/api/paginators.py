@@ -1,5 +1,91 @@
-from rest_framework.pagination import PageNumberPagination
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from core.versions import RECIPES_VERSION, get_version
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator of recipes caching COUNT(*) of the query for a short
+    time. Key includes RECIPES_VERSION, so the count is dropped with
+    any change of recipes, a stale count would cut the last page.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            # Query of .none() cannot be compiled.
+            return 0
+        key = (
+            f'count:{get_version(RECIPES_VERSION)[0]}:'
+            f'{md5(sql.encode()).hexdigest()}'
+        )
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+        return count
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-created', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # OrderingFilter of the view has no default ordering.
+        if OrderingFilter.ordering_param not in request.query_params:
+            return self.ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipePagination(CustomPagination):
+    """Page number pagination with cached count and opt-in keyset
+    (cursor) mode enabled by 'pagination=cursor' query param.
+    Search results are ordered by rank and always paginated by pages.
+    """
+    django_paginator_class = CachedCountPaginator
+    mode_query_param = 'pagination'
+    search_query_param = 'search'
+    cursor_paginator = None
+
+    def is_cursor_mode(self, request):
+        if request.query_params.get(self.search_query_param):
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or RecipeCursorPagination.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Per-user relations change without RECIPES_VERSION bump,
+        # lists filtered by them are counted every time.
+        self.django_paginator_class = (
+            Paginator if any(
+                request.query_params.get(param)
+                for param in getattr(view, 'user_query_params', ())
+            ) else CachedCountPaginator
+        )
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,113 @@
+"""Read-only representations of hot list endpoints.
+
+Functions build plain dicts from prefetched instances or '.values()'
+rows without DRF fields machinery. Output must stay the same as
+of the serializers in 'api.serializers', it's checked by
+'api.tests.test_representations' and 'benchmark --contract' command.
+"""
+from django.conf import settings
+
+
+def represent_file(file, request):
+    """Same as DRF FileField/ImageField representation with URLs."""
+    if not file:
+        return None
+    try:
+        url = file.url
+    except AttributeError:
+        return None
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def represent_image_renditions(recipe, request):
+    """Return URLs of resized copies of the image, the original
+    image URL is used until the copies are processed.
+    """
+    if not recipe.image:
+        return None
+    storage = recipe.image.storage
+
+    def build_url(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    return {
+        size_name: {
+            extension: build_url(
+                recipe.image_renditions.get(size_name, {}).get(
+                    extension, recipe.image.name
+                )
+            )
+            for extension in settings.IMAGE_RENDITION_FORMATS
+        }
+        for size_name in settings.IMAGE_RENDITIONS
+    }
+
+
+def represent_tag(tag):
+    return {
+        'id': tag.id,
+        'name': tag.name,
+        'color': tag.color,
+        'slug': tag.slug,
+    }
+
+
+def represent_recipes(recipes, request):
+    """Represent recipes of RecipeViewSet queryset: author is selected,
+    tags and ingredients are prefetched and per-user flags annotated.
+    """
+    tags = dict()
+    represented = list()
+    for recipe in recipes:
+        author = recipe.author
+        recipe_tags = list()
+        for tag in recipe.tags.all():
+            if tag.pk not in tags:
+                tags[tag.pk] = represent_tag(tag)
+            recipe_tags.append(tags[tag.pk])
+        represented.append({
+            'id': recipe.id,
+            'tags': recipe_tags,
+            'author': {
+                'email': author.email,
+                'id': author.id,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'is_subscribed': recipe.author_is_subscribed,
+            },
+            'ingredients': [
+                {
+                    'pk': ingredient.pk,
+                    'name': str(ingredient.ingredient),
+                    'measurement_unit': ingredient.ingredient.measure,
+                    'amount': ingredient.amount,
+                }
+                for ingredient in recipe.ingredientrecipe_set.all()
+            ],
+            'is_favorited': recipe.is_favorited,
+            'is_in_shopping_cart': recipe.is_in_shopping_cart,
+            'name': recipe.name,
+            'image': represent_file(recipe.image, request),
+            'image_renditions': represent_image_renditions(recipe, request),
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        })
+    return represented
+
+
+def represent_ingredients(ingredients):
+    """Represent ingredients queryset by one '.values()' query
+    or an iterable of instances.
+    """
+    if hasattr(ingredients, 'values'):
+        return list(ingredients.values('id', 'name', 'measure'))
+    return [
+        {
+            'id': ingredient.id,
+            'name': ingredient.name,
+            'measure': ingredient.measure,
+        }
+        for ingredient in ingredients
+    ]
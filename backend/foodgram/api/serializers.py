@@ -1,12 +1,18 @@
+import json
+
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.core.paginator import Paginator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import QueryDict
 from rest_framework import serializers
 
 from core.fields import Base64ImageField
-from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+from recipes.counters import update_tags_masks
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCartIngredient, Tag, TagRecipe,
+                            get_tags_mask)
 from users.models import User
+from .representations import represent_image_renditions
 
 
 class RecipeSmallReadOnlySerialiazer(serializers.ModelSerializer):
@@ -46,14 +52,17 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         ]
 
     def get_recipes_count(self, obj: User):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def paginated_recipes(self, obj):
-        default_page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 6)
-        limit = self.context['request'].query_params.get('recipes_limit')
-        page_size = limit or default_page_size
-        paginator = Paginator(obj.recipes.all(), page_size)
-        recipes = paginator.page(1)
+        # 'limited_recipes' is prefetched by UserViewSet.subscriptions.
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            limit = self.context.get(
+                'recipes_limit',
+                settings.REST_FRAMEWORK.get('PAGE_SIZE', 6)
+            )
+            recipes = obj.recipes.all()[:limit]
         serializer = RecipeSmallReadOnlySerialiazer(recipes, many=True)
         return serializer.data
 
@@ -107,11 +116,29 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
+    def get_subscription_ids(self) -> set:
+        """Return ids of authors followed by the current user.
+
+        Ids are fetched once per request and shared through the context
+        with every serializer of the request, nested ones included.
+        """
+        if 'subscription_ids' not in self.context:
+            user = self.context['request'].user
+            self.context['subscription_ids'] = set(
+                user.subscriptions.values_list('pk', flat=True)
+            ) if user.is_authenticated else set()
+        return self.context['subscription_ids']
+
     def get_is_subscribed(self, obj: User) -> bool:
+        # Querysets built by the views annotate the flag beforehand,
+        # the set lookup below is only a fallback for bare instances.
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
         user = self.context['request'].user
-        if isinstance(user, AnonymousUser):
+        if isinstance(user, AnonymousUser) or user.pk == obj.pk:
             return False
-        return User.objects.filter(pk=user.pk, subscriptions=obj).exists()
+        return obj.pk in self.get_subscription_ids()
 
 
 class IngredientRecipeSerializer(serializers.ModelSerializer):
@@ -158,6 +185,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         required=False
     )
     image = Base64ImageField()
+    image_renditions = serializers.SerializerMethodField()
     ingredients = IngredientRecipeSerializer(
         source='ingredientrecipe_set',
         many=True,
@@ -175,6 +203,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time'
         ]
@@ -186,10 +215,36 @@ class RecipeSerializer(serializers.ModelSerializer):
             )
         ]
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            # Multipart uploads send the image as a file, nested
+            # ingredients are passed as a JSON string then.
+            tags = data.getlist('tags')
+            ingredients = data.get('ingredients')
+            data = data.dict()
+            if tags:
+                data['tags'] = tags
+            if ingredients is not None:
+                try:
+                    data['ingredients'] = json.loads(ingredients)
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {'ingredients': 'Value must be a valid JSON.'}
+                    )
+        return super().to_internal_value(data)
+
     def validate_ingredients(self, values):
-        for value in values:
-            pk = value.get('ingredient').get('pk')
-            if not Ingredient.objects.filter(pk=pk).exists():
+        pks = [value.get('ingredient').get('pk') for value in values]
+        duplicates = {pk for pk in pks if pks.count(pk) > 1}
+        if duplicates:
+            raise serializers.ValidationError(
+                f'Ingredients are duplicated: {sorted(duplicates)}.'
+            )
+        existing = set(Ingredient.objects.filter(
+            pk__in=pks
+        ).values_list('pk', flat=True))
+        for pk in pks:
+            if pk not in existing:
                 raise serializers.ValidationError(
                     f'Theres no ingredient with id {pk}.'
                 )
@@ -211,65 +266,114 @@ class RecipeSerializer(serializers.ModelSerializer):
             )
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredient_set = validated_data.pop('ingredientrecipe_set')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        for ingredient in ingredient_set:
-            current_ingredient_pk = ingredient.get('ingredient').get('pk')
-            current_ingredient = Ingredient.objects.get(
-                pk=current_ingredient_pk
-            )
-            IngredientRecipe.objects.create(
+        recipe = Recipe.objects.create(
+            **validated_data, tags_mask=get_tags_mask(set(tags))
+        )
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
                 recipe=recipe,
-                ingredient=current_ingredient,
+                ingredient_id=ingredient.get('ingredient').get('pk'),
                 amount=ingredient.get('amount')
             )
-        for tag in tags:
-            TagRecipe.objects.create(
-                tag=tag,
-                recipe=recipe
-            )
+            for ingredient in ingredient_set
+        ])
+        TagRecipe.objects.bulk_create([
+            TagRecipe(tag=tag, recipe=recipe) for tag in set(tags)
+        ])
         return recipe
 
+    def update_ingredients(self, instance: Recipe, ingredients_set):
+        """Insert, update and delete only changed ingredients and
+        sync shopping lists of users who have the recipe in cart.
+        """
+        amounts = {
+            ingredient.get('ingredient').get('pk'): ingredient.get('amount')
+            for ingredient in ingredients_set
+        }
+        current = {
+            ingredient.ingredient_id: ingredient
+            for ingredient in instance.ingredientrecipe_set.all()
+        }
+        deltas = dict()
+        changed = list()
+        for pk, ingredient in current.items():
+            amount = amounts.get(pk, 0)
+            if amount != ingredient.amount:
+                deltas[pk] = amount - ingredient.amount
+                if amount:
+                    ingredient.amount = amount
+                    changed.append(ingredient)
+        IngredientRecipe.objects.filter(
+            recipe=instance,
+            ingredient_id__in=current.keys() - amounts.keys()
+        ).delete()
+        IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(recipe=instance, ingredient_id=pk, amount=amount)
+            for pk, amount in amounts.items() if pk not in current
+        ])
+        deltas.update({
+            pk: amount for pk, amount in amounts.items() if pk not in current
+        })
+        ShoppingCartIngredient.objects.apply_delta(
+            ShoppingCartIngredient.objects.get_cart_user_ids(instance.pk),
+            deltas
+        )
+
+    def update_tags(self, instance: Recipe, tags):
+        current = {tag.pk for tag in instance.tags.all()}
+        new = {tag.pk for tag in tags}
+        TagRecipe.objects.filter(
+            recipe=instance, tag_id__in=current - new
+        ).delete()
+        TagRecipe.objects.bulk_create([
+            TagRecipe(recipe=instance, tag_id=pk) for pk in new - current
+        ])
+        # Bulk inserts send no signals.
+        update_tags_masks(Recipe, [instance.pk])
+
+    @transaction.atomic
     def update(self, instance: Recipe, validated_data):
         ingredients_set = validated_data.pop('ingredientrecipe_set', [])
+        tags = validated_data.pop('tags', None)
         super(RecipeSerializer, self).update(instance, validated_data)
-        data_ingredients = list()
-        for index in range(len(ingredients_set)):
-            ingredient = ingredients_set[index]
-            if ingredient and ingredient.get('ingredient'):
-                data_ingredients.append([get_object_or_404(
-                        Ingredient, pk=ingredient.get('ingredient').get('pk')
-                    ), ingredients_set[index].get('amount')])
-        if data_ingredients:
-            IngredientRecipe.objects.filter(recipe=instance).delete()
-            for ingredient in data_ingredients:
-                IngredientRecipe.objects.create(
-                    recipe=instance,
-                    ingredient=ingredient[0],
-                    amount=ingredient[1]
-                )
+        if ingredients_set:
+            self.update_ingredients(instance, ingredients_set)
+        if tags is not None:
+            self.update_tags(instance, tags)
         return instance
 
     def to_representation(self, instance):
+        author_is_subscribed = getattr(
+            instance, 'author_is_subscribed', None
+        )
+        if author_is_subscribed is not None:
+            instance.author.is_subscribed = author_is_subscribed
         ret = super().to_representation(instance)
-        new_tag_representation = list()
-        for tag_id in ret['tags']:
-            tag = get_object_or_404(Tag, pk=tag_id)
-            serialized_data = TagSerializer(tag)
-            new_tag_representation.append(serialized_data.data)
-        ret['tags'] = new_tag_representation
+        ret['tags'] = TagSerializer(instance.tags.all(), many=True).data
         return ret
 
+    def get_image_renditions(self, obj: Recipe):
+        return represent_image_renditions(obj, self.context.get('request'))
+
     def get_is_in_shopping_cart(self, obj):
         if self.context:
+            is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+            if is_in_shopping_cart is not None:
+                return is_in_shopping_cart
             user = self.context['request'].user
-            return user in obj.shopping_users.all()
+            return obj.shopping_users.filter(pk=user.pk).exists()
         return
 
     def get_is_favorited(self, obj):
         if self.context:
+            is_favorited = getattr(obj, 'is_favorited', None)
+            if is_favorited is not None:
+                return is_favorited
             user = self.context['request'].user
-            return user in obj.favorited_users.all()
+            return obj.favorited_users.filter(pk=user.pk).exists()
         return
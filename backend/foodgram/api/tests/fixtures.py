@@ -0,0 +1,49 @@
+from recipes.counters import update_tags_masks
+from recipes.models import (Ingredient, IngredientRecipe, Recipe, Tag,
+                            TagRecipe)
+from users.models import User
+
+
+def create_user(number, **kwargs):
+    return User.objects.create_user(
+        email=f'user{number}@foodgram.ru',
+        username=f'user{number}',
+        first_name='Имя',
+        last_name='Фамилия',
+        **kwargs
+    )
+
+
+def create_recipes(author, number, tags_number=2, ingredients_number=3):
+    """Create recipes with tags and ingredients bypassing the API."""
+    tags = list(Tag.objects.all()[:tags_number])
+    for index in range(len(tags), tags_number):
+        tags.append(Tag.objects.create(
+            name=f'Тег {index}', color=f'#00000{index}', slug=f'tag{index}'
+        ))
+    ingredients = list(Ingredient.objects.all()[:ingredients_number])
+    for index in range(len(ingredients), ingredients_number):
+        ingredients.append(Ingredient.objects.create(
+            name=f'Ингредиент {index}', measure='г'
+        ))
+    start = Recipe.objects.count()
+    recipes = [
+        Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {start + index}',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+        for index in range(number)
+    ]
+    TagRecipe.objects.bulk_create([
+        TagRecipe(recipe=recipe, tag=tag)
+        for recipe in recipes for tag in tags
+    ])
+    update_tags_masks(Recipe, [recipe.pk for recipe in recipes])
+    IngredientRecipe.objects.bulk_create([
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=5)
+        for recipe in recipes for ingredient in ingredients
+    ])
+    return recipes
@@ -0,0 +1,83 @@
+import asyncio
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import async_views
+
+from .fixtures import create_recipes, create_user
+
+
+def asgi_get(path, query_string='', headers=()):
+    """Serve GET request by the ASGI handler, return status and body."""
+    messages = list()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query_string.encode(),
+        'headers': [
+            (name.encode(), value.encode()) for name, value in headers
+        ],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1000),
+    }
+    asyncio.run(ASGIHandler()(scope, receive, send))
+    status = messages[0]['status']
+    body = b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+    return status, body
+
+
+class AsyncShoppingCartTest(TransactionTestCase):
+    """Shopping list export is served by async views under ASGI.
+
+    Pool threads have their own DB connections, so data is committed.
+    """
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('recipes.signals.schedule_image_processing')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        author = create_user(1)
+        self.reader = create_user(2)
+        for recipe in create_recipes(author, 2):
+            recipe.shopping_users.add(self.reader)
+        self.token = Token.objects.create(user=self.reader)
+
+    def download(self, export_format):
+        with async_views(True):
+            return asgi_get(
+                '/api/recipes/download_shopping_cart/',
+                f'format={export_format}',
+                [('authorization', f'Token {self.token.key}')]
+            )
+
+    def test_txt(self):
+        status, body = self.download('txt')
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            body.decode().splitlines(),
+            [f'Ингредиент {index} 10 г' for index in range(3)]
+        )
+
+    def test_csv(self):
+        status, body = self.download('csv')
+        self.assertEqual(status, 200)
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0], 'name,amount,measurement_unit')
+        self.assertEqual(len(lines), 4)
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from core.versions import CATALOGUE_VERSION, get_version
+from recipes.models import Tag
+
+
+class CatalogueCacheTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified_without_queries(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(self.client.get('/api/tags/').status_code, 401)
+
+    def test_version_is_stable(self):
+        # Version is of the data, not of the cache entry or process.
+        response = self.client.get('/api/tags/')
+        cache.clear()
+        repeated = self.client.get('/api/tags/')
+        self.assertEqual(repeated['ETag'], response['ETag'])
+        self.assertEqual(repeated['Last-Modified'], response['Last-Modified'])
+
+    def test_version_changes_with_data(self):
+        version = get_version(CATALOGUE_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        self.assertNotEqual(get_version(CATALOGUE_VERSION), version)
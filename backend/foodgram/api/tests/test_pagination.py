@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from .fixtures import create_recipes, create_user
+
+
+class CursorPaginationTest(APITestCase):
+    """Keyset mode of the recipe feed works with and without
+    'ordering' query param of OrderingFilter.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipes = create_recipes(create_user(1), 5)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_all_pages(self, url):
+        ids = list()
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_default_ordering(self):
+        self.assertEqual(
+            self.get_all_pages('/api/recipes/?pagination=cursor&limit=2'),
+            [recipe.pk for recipe in reversed(self.recipes)]
+        )
+
+    def test_ordering_param(self):
+        self.assertEqual(
+            self.get_all_pages(
+                '/api/recipes/?pagination=cursor&limit=2&ordering=created'
+            ),
+            [recipe.pk for recipe in self.recipes]
+        )
+
+
+class PageCountTest(APITestCase):
+    """Cached page count follows changes of the listed recipes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user(2)
+        cls.recipes = create_recipes(create_user(1), 3)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_page(self, url, recipes):
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], len(recipes))
+        self.assertEqual(
+            {recipe['id'] for recipe in response.data['results']},
+            {recipe.pk for recipe in recipes}
+        )
+
+    def test_new_recipe(self):
+        self.assert_page('/api/recipes/', self.recipes)
+        with mock.patch('recipes.signals.schedule_image_processing'), \
+                self.captureOnCommitCallbacks(execute=True):
+            recipes = self.recipes + create_recipes(self.reader, 1)
+        self.assert_page('/api/recipes/', recipes)
+
+    def test_favorites_filter(self):
+        self.client.force_authenticate(self.reader)
+        url = '/api/recipes/?is_favorited=1'
+        for number in range(1, 3):
+            self.recipes[number].favorited_users.add(self.reader)
+            self.assert_page(url, self.recipes[1:number + 1])
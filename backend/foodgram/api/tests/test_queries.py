@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from core.versions import RECIPES_VERSION, get_version
+from .fixtures import create_recipes, create_user
+
+
+class QueryBudgetTest(APITestCase):
+    """Number of queries of hot endpoints doesn't depend on the number
+    of recipes, tags, ingredients and subscriptions on the page.
+    """
+    # Page count, recipes with per-user flags, tags, ingredients.
+    RECIPE_LIST_QUERIES = 4
+    # Recipe with per-user flags, tags, ingredients.
+    RECIPE_DETAIL_QUERIES = 3
+    # Page count, authors, their latest recipes.
+    SUBSCRIPTIONS_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.reader = create_user(2)
+
+    def setUp(self):
+        # Responses and page counts are cached, budgets are of misses.
+        cache.clear()
+
+    def add_data(self, recipes_number):
+        recipes = create_recipes(
+            self.author, recipes_number, tags_number=3, ingredients_number=4
+        )
+        self.reader.subscriptions.add(self.author)
+        for number in range(recipes_number):
+            author = create_user(100 + len(self.reader.subscriptions.all()))
+            create_recipes(author, 2)
+            self.reader.subscriptions.add(author)
+        recipes[0].favorited_users.add(self.reader)
+        recipes[0].shopping_users.add(self.reader)
+        return recipes[0]
+
+    def assert_budget(self, url, queries, user=None):
+        self.client.force_authenticate(user)
+        for recipes_number in (1, 6):
+            recipe = self.add_data(recipes_number)
+            cache.clear()
+            # Version is loaded once per VERSION_TTL, not per request.
+            get_version(RECIPES_VERSION)
+            with self.assertNumQueries(queries):
+                response = self.client.get(url.format(recipe=recipe.pk))
+            self.assertEqual(response.status_code, 200)
+
+    def test_recipe_list_anonymous(self):
+        self.assert_budget('/api/recipes/', self.RECIPE_LIST_QUERIES)
+
+    def test_recipe_list(self):
+        self.assert_budget(
+            '/api/recipes/', self.RECIPE_LIST_QUERIES, self.reader
+        )
+
+    def test_recipe_detail_anonymous(self):
+        self.assert_budget(
+            '/api/recipes/{recipe}/', self.RECIPE_DETAIL_QUERIES
+        )
+
+    def test_recipe_detail(self):
+        self.assert_budget(
+            '/api/recipes/{recipe}/', self.RECIPE_DETAIL_QUERIES, self.reader
+        )
+
+    def test_subscriptions(self):
+        self.assert_budget(
+            '/api/users/subscriptions/?recipes_limit=3',
+            self.SUBSCRIPTIONS_QUERIES,
+            self.reader
+        )
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from .fixtures import create_recipes, create_user
+
+
+class RecipeCacheTest(APITestCase):
+    """Cached recipe responses follow changes of the recipes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.reader = create_user(2)
+        cls.recipes = create_recipes(cls.author, 3)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('recipes.signals.schedule_image_processing')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_list(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_new_recipe(self):
+        data = self.get_list()
+        self.assertEqual(data['count'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe, = create_recipes(self.author, 1)
+        data = self.get_list()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [recipe.pk] + [item.pk for item in reversed(self.recipes)]
+        )
+
+    def test_changed_recipe(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.pk}/'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Новое название'
+            recipe.save()
+        self.assertEqual(self.client.get(url).data['name'], 'Новое название')
+
+    def test_user_fields_of_cached_response(self):
+        self.recipes[0].favorited_users.add(self.reader)
+        self.get_list()
+        self.client.force_authenticate(self.reader)
+        favorited = {
+            item['id']: item['is_favorited']
+            for item in self.get_list()['results']
+        }
+        self.assertEqual(favorited, {
+            recipe.pk: recipe == self.recipes[0] for recipe in self.recipes
+        })
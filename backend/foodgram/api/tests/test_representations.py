@@ -0,0 +1,64 @@
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.representations import represent_ingredients, represent_recipes
+from api.serializers import IngredientSerializer, RecipeSerializer
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Recipe
+
+from .fixtures import create_recipes, create_user
+
+
+class RepresentationsContractTest(APITestCase):
+    """Read-only representations render the same output
+    as the serializers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user(1)
+        cls.reader = create_user(2)
+        recipes = create_recipes(author, 3)
+        create_recipes(cls.reader, 1)
+        recipes[0].favorited_users.add(cls.reader)
+        recipes[1].shopping_users.add(cls.reader)
+        cls.reader.subscriptions.add(author)
+        Recipe.objects.filter(pk=recipes[2].pk).update(image_renditions={
+            'card': {'webp': 'recipes/renditions/recipe-card.webp'}
+        })
+
+    def get_view(self, user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return RecipeViewSet(
+            request=request, action='list', format_kwarg=None, kwargs={}
+        )
+
+    def assert_same_output(self, represented, serialized):
+        render = JSONRenderer().render
+        self.assertEqual(render(represented), render(serialized))
+
+    def test_recipes(self):
+        for user in (AnonymousUser(), self.reader):
+            with self.subTest(authenticated=user.is_authenticated):
+                view = self.get_view(user)
+                recipes = list(view.get_queryset())
+                self.assert_same_output(
+                    represent_recipes(recipes, view.request),
+                    RecipeSerializer(
+                        recipes, many=True,
+                        context=view.get_serializer_context()
+                    ).data
+                )
+
+    def test_ingredients(self):
+        ingredients = Ingredient.objects.all()
+        serialized = IngredientSerializer(ingredients, many=True).data
+        self.assert_same_output(
+            represent_ingredients(ingredients), serialized
+        )
+        self.assert_same_output(
+            represent_ingredients(list(ingredients)), serialized
+        )
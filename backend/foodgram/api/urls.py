@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
+from core.views import auth_cache_stats, db_stats
+
+from .async_views import async_read_urls
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 router = SimpleRouter()
@@ -20,9 +24,17 @@ router.register(
 
 authpatterns = [
     path('', include('djoser.urls')),
-    path('auth/', include('djoser.urls.authtoken'))
+    path('auth/', include('djoser.urls.authtoken')),
+    path('auth/cache_stats/', auth_cache_stats, name='auth_cache_stats'),
 ]
 
+router_urls = router.urls
+if settings.ASYNC_VIEWS['ENABLED']:
+    router_urls = async_read_urls(
+        router_urls, settings.ASYNC_VIEWS['BASENAMES']
+    )
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
+    path('db/stats/', db_stats, name='db_stats'),
 ] + authpatterns
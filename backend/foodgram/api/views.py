@@ -1,30 +1,75 @@
 from django.contrib.auth.hashers import check_password
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Prefetch, Subquery, Value
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT,
                                    HTTP_201_CREATED)
 from rest_framework.viewsets import ModelViewSet
 
-from recipes.models import Recipe, Ingredient, Tag
+from recipes.autocomplete import ingredient_index
+from recipes.models import Recipe, Ingredient, IngredientRecipe, Tag
 from users.models import User
-from .filters import RecipeFilter, IngredientFilter
+from .exporters import EXPORTERS
+from .filters import RecipeFilter
+from .mixins import CatalogueCacheMixin, ReadOnlyListMixin, RecipeCacheMixin
+from .paginators import RecipePagination
 from .permissions import CustomRecipePermissions
+from .representations import represent_ingredients, represent_recipes
 from .serializers import (RecipeSerializer, IngredientSerializer,
                           TagSerializer, UserSerializer,
                           SubscriptionSerializer,
                           RecipeSmallReadOnlySerialiazer)
 
+MAX_RECIPES_LIMIT = 50
+
 
 class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = []
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            return queryset.annotate(is_subscribed=Exists(
+                User.subscriptions.through.objects.filter(
+                    from_user=user, to_user=OuterRef('pk')
+                )
+            ))
+        return queryset.annotate(is_subscribed=Value(False))
+
+    def get_recipes_limit(self):
+        """Return validated 'recipes_limit' query param capped
+        with MAX_RECIPES_LIMIT.
+        """
+        limit = self.request.query_params.get('recipes_limit')
+        if limit is None:
+            return settings.REST_FRAMEWORK.get('PAGE_SIZE', 6)
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError(
+                {'recipes_limit': 'Value must be an integer.'}
+            )
+        if limit < 0:
+            raise ValidationError(
+                {'recipes_limit': 'Value cannot be negative.'}
+            )
+        return min(limit, MAX_RECIPES_LIMIT)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('subscribe', 'subscriptions'):
+            context['recipes_limit'] = self.get_recipes_limit()
+        return context
+
     @action(
         detail=False,
         methods=['get', ],
@@ -34,7 +79,7 @@ class UserViewSet(ModelViewSet):
         current_user = self.request.user
         data = UserSerializer(
             current_user,
-            context={'request': self.request}
+            context=self.get_serializer_context()
         ).data
         return Response(
             data
@@ -54,7 +99,7 @@ class UserViewSet(ModelViewSet):
                     request.data.get('current_password'), current_pass
             ):
                 current_user.set_password(request.data.get('new_password'))
-                current_user.save()
+                current_user.save(update_fields=['password'])
                 return Response({'message': 'Password successfully changed.'})
             else:
                 return Response(
@@ -82,7 +127,7 @@ class UserViewSet(ModelViewSet):
                     obj.subscribers.add(current_user)
                     data = SubscriptionSerializer(
                         obj,
-                        context={'request': self.request}).data
+                        context=self.get_serializer_context()).data
                     return Response(
                         data=data,
                         status=HTTP_201_CREATED
@@ -120,36 +165,106 @@ class UserViewSet(ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, *args, **kwargs):
-        user_subscriptions = self.request.user.subscriptions.all()
-        queryset = self.paginate_queryset([
-                SubscriptionSerializer(
-                    subscription,
-                    context={'request': self.request}).data
-                for subscription in user_subscriptions
-            ])
-        return self.get_paginated_response(queryset)
+        context = self.get_serializer_context()
+        # Top 'recipes_limit' recipes of every author on the page
+        # are fetched at once with a correlated LIMIT subquery.
+        latest_recipes = Recipe.objects.filter(
+            author=OuterRef('author')
+        ).values('pk')[:context['recipes_limit']]
+        queryset = self.request.user.subscriptions.prefetch_related(
+            Prefetch(
+                'recipes',
+                queryset=Recipe.objects.filter(
+                    pk__in=Subquery(latest_recipes)
+                ),
+                to_attr='limited_recipes'
+            )
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = SubscriptionSerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(RecipeCacheMixin, ReadOnlyListMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [CustomRecipePermissions]
-    filter_backends = [DjangoFilterBackend, ]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = RecipeFilter
+    ordering_fields = ['created', 'favorites_count', 'shopping_count']
+    pagination_class = RecipePagination
     http_method_names = ['get', 'post', 'patch', 'delete', ]
 
     def get_queryset(self):
+        queryset = super().get_queryset().select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(
+                    Recipe.favorited_users.through.objects.filter(
+                        recipe=OuterRef('pk'), user=user
+                    )
+                ),
+                is_in_shopping_cart=Exists(
+                    Recipe.shopping_users.through.objects.filter(
+                        recipe=OuterRef('pk'), user=user
+                    )
+                ),
+                author_is_subscribed=Exists(
+                    User.subscriptions.through.objects.filter(
+                        from_user=user, to_user=OuterRef('author')
+                    )
+                ),
+            )
+        else:
+            queryset = queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_is_subscribed=Value(False),
+            )
         if self.request.query_params.get('is_favorited'):
-            return self.request.user.favorited.all()
+            return queryset.filter(is_favorited=True)
         if self.request.query_params.get('is_in_shopping_cart'):
-            return self.request.user.recipe_set.all()
-        return super().get_queryset()
+            return queryset.filter(is_in_shopping_cart=True)
+        return queryset
+
+    def represent_list(self, objects):
+        return represent_recipes(objects, self.request)
+
+    def perform_content_negotiation(self, request, force=False):
+        # 'format' query param of download_shopping_cart means
+        # the file type, so it must not fail renderer negotiation.
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
+    def refresh_instance(self, serializer):
+        # Response is rendered from the annotated and prefetched
+        # instance instead of querying relations per row.
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
 
     def perform_create(self, serializer):
         serializer.is_valid(raise_exception=True)
         serializer.save(
             author=self.request.user,
         )
+        self.refresh_instance(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.refresh_instance(serializer)
 
     def get_recipe(self):
         return get_object_or_404(Recipe, pk=self.kwargs.get('pk'))
@@ -192,28 +307,12 @@ class RecipeViewSet(ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, *args, **kwargs):
-        Recipe._meta.ordering = []
-        queryset = (Recipe.objects.filter(
-            shopping_users=self.request.user).values(
-            'ingredients__measure', 'ingredients__name').annotate(
-            all_amount=Sum('ingredientrecipe__amount')
-        ))
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = ('attachment;'
-                                           'filename="shopping_list.txt"')
-        data = '\n'.join([
-            ' '.join(
-                [
-                    str(ingredient['ingredients__name']),
-                    str(ingredient['all_amount']),
-                    str(ingredient['ingredients__measure']),
-                ]
+        export_format = self.request.query_params.get('format', 'txt')
+        if export_format not in EXPORTERS:
+            raise ValidationError(
+                {'format': f'Available formats: {", ".join(EXPORTERS)}.'}
             )
-            for ingredient in queryset
-        ])
-        response.write(data)
-        Recipe._meta.ordering = ['-created']
-        return response
+        return EXPORTERS[export_format](self.request.user)
 
     @action(
         detail=True,
@@ -248,16 +347,40 @@ class RecipeViewSet(ModelViewSet):
             )
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(CatalogueCacheMixin, ReadOnlyListMixin,
+                        ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [DjangoFilterBackend, ]
-    filterset_class = IngredientFilter
     http_method_names = ['get', ]
     pagination_class = None
 
+    def get_limit(self):
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return None
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({'limit': 'Value must be an integer.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Value must be positive.'})
+        return limit
+
+    def list(self, request, *args, **kwargs):
+        # Autocomplete is answered from the in-memory index
+        # instead of the 'icontains' scan on every keystroke.
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return Response(represent_ingredients(
+            ingredient_index.search(name, self.get_limit())
+        ))
+
+    def represent_list(self, objects):
+        return represent_ingredients(objects)
+
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(CatalogueCacheMixin, ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     http_method_names = ['get', ]
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+
+class InputFilter(admin.SimpleListFilter):
+    """List filter with a text input instead of the list of all values,
+    so the sidebar doesn't run DISTINCT over the whole table.
+    """
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # Filter is shown only if there are any lookups.
+        return ((None, None),)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = (
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        )
+        yield all_choice
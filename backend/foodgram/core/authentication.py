@@ -0,0 +1,58 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .lru import LRUCache
+
+CACHE_KEY_PREFIX = 'auth_token'
+
+token_cache = LRUCache(
+    settings.TOKEN_AUTH_CACHE['MAX_SIZE'], settings.TOKEN_AUTH_CACHE['TTL']
+)
+
+
+def invalidate_tokens(*keys):
+    for key in keys:
+        token_cache.delete(key)
+    if settings.TOKEN_AUTH_CACHE['USE_DJANGO_CACHE']:
+        cache.delete_many([f'{CACHE_KEY_PREFIX}:{key}' for key in keys])
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(*Token.objects.filter(
+        user_id=user_id
+    ).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement of TokenAuthentication that caches
+    token and user in the process memory and, optionally,
+    in the Django cache.
+
+    Entries are dropped by signals when the token is deleted or the user
+    is saved (password change, deactivation), other processes see
+    the change after 'TTL' seconds at most.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        use_django_cache = settings.TOKEN_AUTH_CACHE['USE_DJANGO_CACHE']
+        if credentials is None and use_django_cache:
+            credentials = cache.get(f'{CACHE_KEY_PREFIX}:{key}')
+            if credentials is not None:
+                token_cache.set(key, credentials)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+            if use_django_cache:
+                cache.set(
+                    f'{CACHE_KEY_PREFIX}:{key}',
+                    credentials,
+                    settings.TOKEN_AUTH_CACHE['TTL']
+                )
+        user, token = credentials
+        # Every request gets its own copy of the shared cached user.
+        return copy.copy(user), token
@@ -0,0 +1,560 @@
+import asyncio
+import base64
+import importlib
+import math
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import clear_url_caches
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.representations import represent_ingredients, represent_recipes
+from api.serializers import IngredientSerializer, RecipeSerializer
+from api.views import RecipeViewSet
+from recipes.counters import reconcile_counters
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCartIngredient, Tag, TagRecipe,
+                            get_tags_mask)
+from recipes.search import install_search_index
+from users.models import User
+
+DATASETS = {
+    'small': {
+        'users': 50,
+        'recipes': 500,
+        'ingredients': 500,
+        'ingredients_per_recipe': 6,
+        'followers': 10,
+        'favorites': 20,
+        'cart_size': 10,
+    },
+    'medium': {
+        'users': 500,
+        'recipes': 5000,
+        'ingredients': 2000,
+        'ingredients_per_recipe': 10,
+        'followers': 30,
+        'favorites': 50,
+        'cart_size': 20,
+    },
+}
+TAGS = ('breakfast', 'lunch', 'dinner', 'dessert', 'vegan', 'fast')
+WORDS = (
+    'борщ', 'суп', 'салат', 'пирог', 'каша', 'рагу', 'паста', 'плов',
+    'курица', 'говядина', 'рыба', 'грибы', 'сыр', 'томат', 'свекла',
+    'картофель', 'морковь', 'лук', 'чеснок', 'яблоко', 'тыква', 'рис',
+)
+PERCENTILES = (50, 90, 95, 99)
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark-password'
+ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+def seed(params, random_seed=0):
+    """Fill empty database with reproducible generated data.
+
+    Rows are bulk created without signals, denormalized counters,
+    tag masks, shopping lists and search index are filled afterwards.
+    Returns the user whose point of view is benchmarked.
+    """
+    rng = random.Random(random_seed)
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(
+                email=f'user{number}@benchmark.local',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(params['users'])
+        ], batch_size=BATCH_SIZE)
+        users = list(User.objects.order_by('pk'))
+        tags = [
+            Tag.objects.create(name=slug, color=f'#{number:06d}', slug=slug)
+            for number, slug in enumerate(TAGS)
+        ]
+        Ingredient.objects.bulk_create([
+            Ingredient(
+                name=f'{rng.choice(WORDS)} {number}',
+                measure=rng.choice(('г', 'мл', 'шт.'))
+            )
+            for number in range(params['ingredients'])
+        ], batch_size=BATCH_SIZE)
+        ingredients = list(Ingredient.objects.order_by('pk'))
+        recipe_tags = list()
+        recipes = list()
+        for number in range(params['recipes']):
+            chosen = rng.sample(tags, rng.randint(1, 3))
+            recipe_tags.append(chosen)
+            recipes.append(Recipe(
+                # Benchmarked user owns the first recipe to update it.
+                author=rng.choice(users) if number else users[0],
+                name=f'{rng.choice(WORDS)} {rng.choice(WORDS)} {number}',
+                text=' '.join(rng.choices(WORDS, k=30)),
+                image='recipes/images/benchmark.png',
+                cooking_time=rng.randint(5, 120),
+                tags_mask=get_tags_mask(chosen),
+            ))
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        recipes = list(Recipe.objects.order_by('pk'))
+        TagRecipe.objects.bulk_create([
+            TagRecipe(recipe=recipe, tag=tag)
+            for recipe, chosen in zip(recipes, recipe_tags)
+            for tag in chosen
+        ], batch_size=BATCH_SIZE)
+        per_recipe = min(params['ingredients_per_recipe'], len(ingredients))
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
+                recipe=recipe, ingredient=ingredient,
+                amount=rng.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient in rng.sample(ingredients, per_recipe)
+        ], batch_size=BATCH_SIZE)
+        # Scenarios need a recipe the user hasn't added to favorites
+        # and cart and an author the user isn't subscribed to.
+        links = (
+            (Recipe.favorited_users.through, params['favorites']),
+            (Recipe.shopping_users.through, params['cart_size']),
+        )
+        for through, size in links:
+            through.objects.bulk_create([
+                through(user=user, recipe=recipe)
+                for user in users
+                for recipe in rng.sample(
+                    recipes, min(size, (len(recipes) - 1) // 2)
+                )
+            ], batch_size=BATCH_SIZE)
+        User.subscriptions.through.objects.bulk_create([
+            User.subscriptions.through(from_user=user, to_user=author)
+            for user in users
+            for author in rng.sample(
+                [other for other in users if other != user],
+                min(params['followers'], len(users) - 2)
+            )
+        ], batch_size=BATCH_SIZE)
+        reconcile_counters(Recipe, User)
+        ShoppingCartIngredient.objects.bulk_create([
+            ShoppingCartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for (user_id, ingredient_id), amount
+            in ShoppingCartIngredient.objects.aggregate_from_carts().items()
+        ], batch_size=BATCH_SIZE)
+        install_search_index()
+    return users[0]
+
+
+def get_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+def consume(response):
+    """Read streaming content so it's included in the measured time."""
+    if response.streaming:
+        response.size = len(b''.join(response.streaming_content))
+    return response
+
+
+def get_size(response):
+    """Size of the body as it's sent, compressed one included."""
+    size = getattr(response, 'size', None)
+    return size if size is not None else len(response.content)
+
+
+class Scenarios:
+    """Requests to every API endpoint from the point of view of
+    anonymous and authenticated users.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        # Same Accept-Encoding as browsers send, so sizes include
+        # the compression.
+        self.anonymous = APIClient(HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING)
+        self.client = APIClient(HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING)
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.own_recipe = Recipe.objects.filter(
+            author=user
+        ).order_by('pk').first()
+        self.recipe = Recipe.objects.exclude(
+            favorited_users=user
+        ).exclude(shopping_users=user).order_by('pk').first()
+        self.author = User.objects.exclude(
+            pk=user.pk
+        ).exclude(subscribers=user).order_by('pk').first()
+        self.ingredients = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)[:5]
+        )
+        self.tag = Tag.objects.order_by('pk').first()
+        self.image = get_image()
+        self.created = 0
+
+    def get_all(self):
+        recipe, author = self.recipe.pk, self.author.pk
+        get = self.get
+        return {
+            'recipes_list_anonymous': get('/api/recipes/', anonymous=True),
+            'recipes_list': get('/api/recipes/'),
+            'recipes_list_last_page': get('/api/recipes/?page=last'),
+            'recipes_list_cursor': get('/api/recipes/?pagination=cursor'),
+            'recipes_list_tags': get(
+                f'/api/recipes/?tags={TAGS[0]}&tags={TAGS[1]}'
+            ),
+            'recipes_list_author': get(f'/api/recipes/?author={author}'),
+            'recipes_list_favorited': get('/api/recipes/?is_favorited=1'),
+            'recipes_search': get(f'/api/recipes/?search={WORDS[0]}'),
+            'recipe_detail': get(f'/api/recipes/{recipe}/'),
+            'recipe_create_delete': self.create_delete_recipe,
+            'recipe_update': self.update_recipe,
+            'favorite_add_remove': self.toggle(
+                f'/api/recipes/{recipe}/favorite/'
+            ),
+            'shopping_cart_add_remove': self.toggle(
+                f'/api/recipes/{recipe}/shopping_cart/'
+            ),
+            'download_shopping_cart_txt': get(
+                '/api/recipes/download_shopping_cart/?format=txt'
+            ),
+            'download_shopping_cart_csv': get(
+                '/api/recipes/download_shopping_cart/?format=csv'
+            ),
+            'download_shopping_cart_pdf': get(
+                '/api/recipes/download_shopping_cart/?format=pdf'
+            ),
+            'users_list': get('/api/users/'),
+            'users_me': get('/api/users/me/'),
+            'user_detail': get(f'/api/users/{author}/'),
+            'subscriptions': get(
+                '/api/users/subscriptions/?recipes_limit=3'
+            ),
+            'subscribe_unsubscribe': self.toggle(
+                f'/api/users/{author}/subscribe/'
+            ),
+            'ingredients_search': get('/api/ingredients/?name=кар'),
+            'ingredients_list': get('/api/ingredients/'),
+            'tags_list': get('/api/tags/'),
+        }
+
+    def get(self, url, anonymous=False):
+        def run():
+            client = self.anonymous if anonymous else self.client
+            return consume(client.get(url))
+        return run
+
+    def toggle(self, url):
+        def run():
+            self.client.post(url)
+            return self.client.delete(url)
+        return run
+
+    def get_recipe_data(self, name):
+        return {
+            'name': name,
+            'text': 'Benchmark recipe.',
+            'cooking_time': 10,
+            'tags': [self.tag.pk],
+            'ingredients': [
+                {'id': pk, 'amount': 10} for pk in self.ingredients
+            ],
+        }
+
+    def create_delete_recipe(self):
+        self.created += 1
+        data = self.get_recipe_data(f'benchmark {self.created}')
+        data['image'] = self.image
+        response = self.client.post('/api/recipes/', data, format='json')
+        if response.status_code != 201:
+            return response
+        return self.client.delete(f'/api/recipes/{response.data["id"]}/')
+
+    def update_recipe(self):
+        self.created += 1
+        data = self.get_recipe_data(self.own_recipe.name)
+        data['cooking_time'] = self.created % 100 + 1
+        return self.client.patch(
+            f'/api/recipes/{self.own_recipe.pk}/', data, format='json'
+        )
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted values."""
+    return values[max(math.ceil(percent / 100 * len(values)), 1) - 1]
+
+
+def measure(run, iterations, warmup):
+    for _ in range(warmup):
+        run()
+    timings = list()
+    queries = list()
+    statuses = set()
+    sizes = list()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context.captured_queries))
+        statuses.add(response.status_code)
+        sizes.append(get_size(response))
+    timings.sort()
+    result = {
+        f'p{percent}': round(percentile(timings, percent), 3)
+        for percent in PERCENTILES
+    }
+    result.update({
+        'mean': round(statistics.mean(timings), 3),
+        'min': round(timings[0], 3),
+        'max': round(timings[-1], 3),
+        'queries': int(statistics.median(queries)),
+        'queries_max': max(queries),
+        'statuses': sorted(statuses),
+        'bytes': int(statistics.median(sizes)),
+    })
+    return result
+
+
+def run_benchmark(user, iterations, warmup, names=None):
+    scenarios = Scenarios(user).get_all()
+    results = dict()
+    for name, run in scenarios.items():
+        if names and name not in names:
+            continue
+        cache.clear()
+        results[name] = measure(run, iterations, warmup)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return descriptions of scenarios that became slower than
+    the baseline by more than 'threshold', run more queries
+    or respond with other status codes.
+    """
+    regressions = list()
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ('p50', 'p95'):
+            limit = previous[metric] * (1 + threshold)
+            if result[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {result[metric]:.1f}ms, '
+                    f'baseline {previous[metric]:.1f}ms'
+                )
+        if result['statuses'] != previous['statuses']:
+            regressions.append(
+                f'{name}: status {result["statuses"]}, '
+                f'baseline {previous["statuses"]}'
+            )
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]} queries, '
+                f'baseline {previous["queries"]}'
+            )
+    return regressions
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = JSONRenderer().render(function())
+    return result, time.perf_counter() - started
+
+
+def check_representations(user, size=100):
+    """Compare rendered output of read-only representations with
+    the serializers one. Return {case: (is_equal, speedup)}.
+    """
+    results = dict()
+    for request_user in (AnonymousUser(), user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = request_user
+        view = RecipeViewSet(
+            request=request, action='list', format_kwarg=None, kwargs={}
+        )
+        recipes = list(view.get_queryset()[:size])
+        fast, fast_time = timed(lambda: represent_recipes(recipes, request))
+        slow, slow_time = timed(lambda: RecipeSerializer(
+            recipes, many=True, context=view.get_serializer_context()
+        ).data)
+        case = 'recipes_' + (
+            'authenticated' if request_user.is_authenticated
+            else 'anonymous'
+        )
+        results[case] = (fast == slow, slow_time / fast_time)
+    ingredients = Ingredient.objects.all()
+    fast, fast_time = timed(lambda: represent_ingredients(ingredients))
+    slow, slow_time = timed(
+        lambda: IngredientSerializer(ingredients, many=True).data
+    )
+    results['ingredients'] = (fast == slow, slow_time / fast_time)
+    instances = list(ingredients)
+    results['ingredients_instances'] = (
+        JSONRenderer().render(represent_ingredients(instances)) == slow, None
+    )
+    return results
+
+
+@contextmanager
+def db_latency(milliseconds):
+    """Add the delay to every SQL query of every thread, as the round
+    trip to a DB server does. Local SQLite answers too fast to show
+    workers blocked by queries otherwise.
+    """
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    for existing in connections.all():
+        install(None, existing)
+    connection_created.connect(install, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for existing in connections.all():
+            if delay in existing.execute_wrappers:
+                existing.execute_wrappers.remove(delay)
+
+
+def reload_urls():
+    # Async views are chosen when URL patterns are built.
+    importlib.reload(importlib.import_module('api.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@contextmanager
+def async_views(enabled):
+    with override_settings(
+            ASYNC_VIEWS={**settings.ASYNC_VIEWS, 'ENABLED': enabled}
+    ):
+        reload_urls()
+        try:
+            yield
+        finally:
+            reload_urls()
+    reload_urls()
+
+
+def get_concurrency_urls():
+    recipe = Recipe.objects.order_by('pk').first()
+    return (
+        '/api/recipes/',
+        '/api/recipes/?page=2',
+        '/api/recipes/?is_favorited=1',
+        f'/api/recipes/{recipe.pk}/',
+        '/api/tags/',
+        '/api/ingredients/?name=кар',
+    )
+
+
+def run_wsgi_load(urls, token, clients, requests, workers):
+    """Closed loop of 'clients' sending 'requests' each to the sync
+    views, at most 'workers' requests are handled at once as by
+    gunicorn sync workers. Return latencies in ms.
+    """
+    slots = threading.Semaphore(workers)
+    latencies = list()
+
+    def run_client(number):
+        client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+        for index in range(requests):
+            started = time.perf_counter()
+            with slots:
+                client.get(urls[(number + index) % len(urls)])
+            latencies.append((time.perf_counter() - started) * 1000)
+        connection.close()
+
+    threads = [
+        threading.Thread(target=run_client, args=(number,))
+        for number in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def run_asgi_load(urls, token, clients, requests):
+    """Same closed loop served by async views of one ASGI worker."""
+    latencies = list()
+
+    async def run_client(number):
+        client = AsyncClient()
+        for index in range(requests):
+            started = time.perf_counter()
+            await client.get(
+                urls[(number + index) % len(urls)],
+                authorization=f'Token {token}'
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    async def run_clients():
+        await asyncio.gather(*(
+            run_client(number) for number in range(clients)
+        ))
+
+    asyncio.run(run_clients())
+    return latencies
+
+
+def run_concurrency(user, clients, requests, workers, latency):
+    """Compare sync views on 'workers' sync workers with async views
+    on one ASGI worker, about the same memory for workers=1, under
+    'clients' concurrent clients and 'latency' ms per SQL query.
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+    urls = get_concurrency_urls()
+    modes = {
+        'wsgi': lambda: run_wsgi_load(
+            urls, token.key, clients, requests, workers
+        ),
+        'asgi': lambda: run_asgi_load(urls, token.key, clients, requests),
+    }
+    results = dict()
+    with db_latency(latency):
+        for mode, run in modes.items():
+            cache.clear()
+            with async_views(mode == 'asgi'):
+                started = time.perf_counter()
+                latencies = sorted(run())
+                duration = time.perf_counter() - started
+            results[mode] = {
+                'rps': round(len(latencies) / duration, 1),
+                **{
+                    f'p{percent}': round(
+                        percentile(latencies, percent), 3
+                    )
+                    for percent in PERCENTILES
+                },
+            }
+    return results
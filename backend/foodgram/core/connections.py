@@ -0,0 +1,57 @@
+"""Persistent database connections: health checks, metrics and warm-up."""
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+connection_stats = Counter()
+
+
+def check_connections():
+    """Close persistent connections of the current thread which were
+    idle longer than HEALTH_CHECK_INTERVAL and are broken, so the
+    request reconnects instead of failing on its first query.
+    """
+    now = time.monotonic()
+    interval = settings.DATABASE_CONNECTIONS['HEALTH_CHECK_INTERVAL']
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        last_used = getattr(connection, 'last_used', None)
+        if last_used is not None and now - last_used < interval:
+            continue
+        connection_stats[f'{connection.alias}.health_checks'] += 1
+        if not connection.is_usable():
+            connection_stats[f'{connection.alias}.unhealthy'] += 1
+            connection.close()
+
+
+def mark_connections_used():
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+
+
+def warm_up_connections():
+    """Connect at worker boot, so the first request doesn't pay
+    for it, when CONN_MAX_AGE allows to keep the connection.
+    """
+    for connection in connections.all():
+        if connection.settings_dict['CONN_MAX_AGE'] == 0:
+            continue
+        try:
+            connection.ensure_connection()
+            connection.last_used = time.monotonic()
+        except DatabaseError as error:
+            logger.warning(
+                'Warm-up of %s database failed: %s', connection.alias, error
+            )
+
+
+def get_stats():
+    return {'connections': dict(connection_stats)}
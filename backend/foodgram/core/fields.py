@@ -1,16 +1,119 @@
 import base64
+import binascii
+import tempfile
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
 from rest_framework import serializers
 
+BASE64_MARKER = ';base64,'
+# Number of base64 characters decoded at once, must be a multiple of 4.
+DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_SIGNATURES = {
+    'jpeg': (b'\xff\xd8\xff',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'webp': (b'RIFF',),
+}
+
+
+def detect_image_type(head):
+    for image_type, signatures in IMAGE_SIGNATURES.items():
+        if head.startswith(signatures):
+            if image_type == 'webp' and head[8:12] != b'WEBP':
+                continue
+            return image_type
+    return None
+
+
+def check_dimensions(width, height):
+    max_dimension = settings.RECIPE_IMAGE_MAX_DIMENSION
+    if width > max_dimension or height > max_dimension:
+        raise serializers.ValidationError(
+            f'Image dimensions cannot exceed {max_dimension}px.'
+        )
+
 
 class Base64ImageField(serializers.ImageField):
-    """Custom ImageField that encode/decode image data to a string."""
+    """Custom ImageField that encode/decode image data to a string.
+
+    Data URI is decoded by chunks into a spooled temporary file, type
+    and size of the image are checked before the whole payload is decoded.
+    Regular multipart file uploads are accepted as well.
+    """
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format_type, image_string = data.split(';base64,')
-            ext = format_type.split('/')[-1]
-            data = ContentFile(
-                base64.b64decode(image_string), name='temp.' + ext
-            )
+            data = self.decode_data_uri(data)
         return super().to_internal_value(data)
+
+    def decode_data_uri(self, data):
+        marker = data.find(BASE64_MARKER, 0, 100)
+        if marker == -1:
+            raise serializers.ValidationError('Image must be base64 encoded.')
+        start = marker + len(BASE64_MARKER)
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        size = (len(data) - start) * 3 // 4
+        if size > max_size:
+            raise serializers.ValidationError(
+                f'Image size cannot exceed {max_size} bytes.'
+            )
+        image_type = None
+        # Small images stay in memory, bigger ones are spooled to disk.
+        file = UploadedFile(tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        ))
+        try:
+            for position in range(start, len(data), DECODE_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    data[position:position + DECODE_CHUNK_SIZE],
+                    validate=True
+                )
+                if image_type is None:
+                    image_type = self.check_head(chunk)
+                file.write(chunk)
+        except binascii.Error:
+            file.close()
+            raise serializers.ValidationError(
+                'Image data is not valid base64.'
+            )
+        except serializers.ValidationError:
+            file.close()
+            raise
+        if image_type is None:
+            file.close()
+            raise serializers.ValidationError('Image data is empty.')
+        file.name = f'temp.{image_type}'
+        file.content_type = f'image/{image_type}'
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def check_head(self, head):
+        """Check type and dimensions of the image by its first bytes."""
+        image_type = detect_image_type(head)
+        if image_type is None:
+            raise serializers.ValidationError(
+                'Upload a valid image. Supported types: '
+                f'{", ".join(IMAGE_SIGNATURES)}.'
+            )
+        try:
+            width, height = Image.open(BytesIO(head)).size
+        except Exception:
+            # Header doesn't fit into the first chunk, dimensions
+            # are checked by 'run_validators' after decoding.
+            return image_type
+        check_dimensions(width, height)
+        return image_type
+
+    def run_validators(self, value):
+        super().run_validators(value)
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if value.size > max_size:
+            raise serializers.ValidationError(
+                f'Image size cannot exceed {max_size} bytes.'
+            )
+        # Django ImageField leaves verified Pillow image on the file.
+        check_dimensions(*value.image.size)
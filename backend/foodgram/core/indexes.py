@@ -0,0 +1,35 @@
+"""Indexes of case-insensitive admin search.
+
+On PostgreSQL admin '^field' and '=field' search compiles to
+UPPER("field"::text) LIKE/= UPPER(...), which plain btree indexes
+of the field can't serve. Django 3.2 has no way to declare operator
+class of an expression index, so the indexes are made by migrations.
+Other databases don't need them.
+"""
+from django.db import migrations
+
+
+def upper_pattern_index(model, field, name):
+    """Migration operation creating btree index on UPPER(field::text)
+    with text_pattern_ops, used by both prefix and exact lookups.
+    'model' is '<app_label>.<ModelName>'.
+    """
+    def create(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        opts = apps.get_model(model)._meta
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(name)} '
+            f'ON {quote(opts.db_table)} '
+            f'(UPPER({quote(opts.get_field(field).column)}::text) '
+            f'text_pattern_ops)'
+        )
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(
+                f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}'
+            )
+
+    return migrations.RunPython(create, drop)
@@ -0,0 +1,228 @@
+import json
+import os
+import platform
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from core.benchmark import (DATASETS, check_representations, compare,
+                            run_benchmark, run_concurrency, seed)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark API endpoints on a generated dataset in a separate '
+        'test database and compare results with a baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset',
+            choices=DATASETS,
+            default='small',
+            help='Size of the generated dataset.'
+        )
+        for name in DATASETS['small']:
+            parser.add_argument(
+                f'--{name.replace("_", "-")}',
+                type=int,
+                help=f'Override "{name}" parameter of the dataset.'
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of the dataset.'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Number of measured requests per scenario.'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Number of not measured requests per scenario.'
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Run only given scenarios, may be repeated.'
+        )
+        parser.add_argument(
+            '--contract',
+            action='store_true',
+            help=(
+                'Only check that read-only representations render '
+                'the same output as serializers.'
+            )
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help=(
+                'Only compare sync views on WSGI workers with async '
+                'views on one ASGI worker under the number of '
+                'concurrent clients, each sending --iterations requests.'
+            )
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of sync workers of --concurrency run.'
+        )
+        parser.add_argument(
+            '--db-latency',
+            type=float,
+            default=5,
+            help='Delay in ms added to SQL queries of --concurrency run.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Save results to the JSON file to use it as a baseline.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Compare results with the JSON file saved by --output.'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Allowed relative slowdown of p50 and p95 latency.'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('Iterations must be positive.')
+        params = dict(DATASETS[options['dataset']])
+        for name in params:
+            if options[name] is not None:
+                params[name] = options[name]
+        if any(value < 0 for value in params.values()):
+            raise CommandError('Dataset parameters must not be negative.')
+        if params['users'] < 2 or params['recipes'] < 1:
+            raise CommandError('Dataset needs 2 users and 1 recipe at least.')
+        if options['contract']:
+            self.check_contract(params, options)
+            return
+        if options['concurrency'] is not None:
+            self.compare_concurrency(params, options)
+            return
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        results = self.run(params, options)
+        report = {
+            'meta': {
+                'dataset': params,
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'results': results,
+        }
+        self.print_results(results, baseline and baseline['results'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if baseline is None:
+            return
+        if baseline['meta']['dataset'] != params:
+            self.stderr.write(
+                'Warning: baseline was measured on a different dataset.'
+            )
+        regressions = compare(
+            results, baseline['results'], options['threshold']
+        )
+        if regressions:
+            self.stderr.write('\n'.join(regressions))
+            raise CommandError(f'{len(regressions)} regressions found.')
+        self.stdout.write(self.style.SUCCESS('No regressions found!'))
+
+    def check_contract(self, params, options):
+        results = self.run(
+            params, options,
+            lambda user: check_representations(user)
+        )
+        for case, (is_equal, speedup) in results.items():
+            self.stdout.write(
+                f'{case}: {"same output" if is_equal else "DIFFERENT"}'
+                + (f', {speedup:.1f}x faster' if speedup else '')
+            )
+        if not all(is_equal for is_equal, _ in results.values()):
+            raise CommandError('Representations differ from serializers.')
+        self.stdout.write(self.style.SUCCESS('Contract holds!'))
+
+    def compare_concurrency(self, params, options):
+        if options['concurrency'] < 1 or options['workers'] < 1:
+            raise CommandError('Concurrency and workers must be positive.')
+        results = self.run(params, options, lambda user: run_concurrency(
+            user,
+            options['concurrency'],
+            options['iterations'],
+            options['workers'],
+            options['db_latency'],
+        ))
+        self.stdout.write(
+            f'{"mode":<8}{"rps":>9}{"p50":>9}{"p95":>9}{"p99":>9}'
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<8}{result["rps"]:>9.1f}{result["p50"]:>9.2f}'
+                f'{result["p95"]:>9.2f}{result["p99"]:>9.2f}'
+            )
+
+    def run(self, params, options, action=None):
+        # Dataset is created in a throwaway test database,
+        # the configured one is never changed.
+        with tempfile.TemporaryDirectory() as directory:
+            test_settings = connection.settings_dict['TEST']
+            if connection.vendor == 'sqlite' and not test_settings['NAME']:
+                # In-memory database is locked by image processing
+                # threads, file one waits for the lock instead.
+                test_settings['NAME'] = os.path.join(
+                    directory, 'benchmark.sqlite3'
+                )
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                with override_settings(MEDIA_ROOT=directory):
+                    user = seed(params, options['seed'])
+                    if action is not None:
+                        return action(user)
+                    return run_benchmark(
+                        user,
+                        options['iterations'],
+                        options['warmup'],
+                        options['scenario']
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+    def print_results(self, results, baseline=None):
+        self.stdout.write(
+            f'{"scenario":<30}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"queries":>9}{"bytes":>9}{"base p50":>10}'
+        )
+        for name, result in results.items():
+            previous = (baseline or {}).get(name)
+            self.stdout.write(
+                f'{name:<30}{result["p50"]:>9.2f}{result["p95"]:>9.2f}'
+                f'{result["p99"]:>9.2f}{result["queries"]:>9}'
+                f'{result.get("bytes", "-"):>9}'
+                f'{previous["p50"] if previous else "-":>10}'
+            )
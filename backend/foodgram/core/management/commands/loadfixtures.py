@@ -1,24 +1,145 @@
 import csv
+import json
+from itertools import islice
+from pathlib import Path
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from core.versions import CATALOGUE_VERSION, bump_version
+from recipes.autocomplete import ingredient_index
 from recipes.models import Ingredient
 
 CSV_ROOT = settings.BASE_DIR / 'data'
+FORMATS = ('csv', 'json')
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def iterate_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """Yield items of the top-level JSON array reading the file by
+    chunks, so only the item being decoded is kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def read():
+        nonlocal buffer, eof
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+    def next_char():
+        nonlocal buffer
+        while True:
+            buffer = buffer.lstrip()
+            if buffer or eof:
+                return buffer[:1]
+            read()
+
+    if next_char() != '[':
+        raise CommandError('JSON fixtures must be an array.')
+    buffer = buffer[1:]
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as error:
+            if eof:
+                raise CommandError(f'Invalid JSON fixtures: {error}.')
+            read()
+            continue
+        if end == len(buffer) and not eof:
+            # A number may continue in the next chunk.
+            read()
+            continue
+        buffer = buffer[end:]
+        yield item
+        separator = next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise CommandError('Invalid JSON fixtures: "," expected.')
+        buffer = buffer[1:]
+
+
+def read_json(file):
+    for item in iterate_json_array(file):
+        yield item['name'], item.get('measurement_unit', item.get('measure'))
+
+
+READERS = dict(zip(FORMATS, (read_csv, read_json)))
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **kwargs):
-        with open(
-                str(CSV_ROOT) + '/ingredients.csv', encoding='utf-8'
-        ) as csvfile:
-            user = csv.reader(csvfile)
-            for row in user:
-                Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measure=row[1]
-                )
-                self.stdout.write(
-                    self.style.SUCCESS('Ingridient fixture loaded!')
-                )
+    help = 'Load ingredients fixtures from CSV or JSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(CSV_ROOT / 'ingredients.csv'),
+            help='Path to the fixtures file.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format, detected by extension if not set.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows inserted by one query.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count new rows without writing them.'
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Unknown fixtures format "{file_format}".')
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive.')
+        # Ingredients have no unique constraint, so existing rows
+        # are skipped by (name, measure) like get_or_create did.
+        existing = set(Ingredient.objects.values_list('name', 'measure'))
+        total = created = 0
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            rows = READERS[file_format](file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                total += len(batch)
+                new = list()
+                for row in batch:
+                    if row not in existing:
+                        existing.add(row)
+                        new.append(Ingredient(name=row[0], measure=row[1]))
+                created += len(new)
+                if not options['dry_run']:
+                    Ingredient.objects.bulk_create(new)
+        if created and not options['dry_run']:
+            # Bulk inserts send no signals. Indexes of other processes
+            # are rebuilt on the version change.
+            bump_version(CATALOGUE_VERSION)
+            ingredient_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Dry run: " if options["dry_run"] else ""}'
+            f'{total} ingredient fixtures read, {created} created, '
+            f'{total - created} skipped.'
+        ))
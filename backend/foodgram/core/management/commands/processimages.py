@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import delete_orphan_renditions, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Make renditions of recipe images that were not processed, '
+            'e.g. when worker was restarted, and delete orphan ones.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Process images of all recipes.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_renditions={})
+        processed = 0
+        for pk, image in recipes.values_list('pk', 'image').iterator():
+            process_recipe_image(pk, image)
+            processed += 1
+        deleted = delete_orphan_renditions()
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} recipe images processed, '
+            f'{deleted} orphan renditions deleted!'
+        ))
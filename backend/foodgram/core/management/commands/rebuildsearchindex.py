@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.search import get_backend, install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search index of recipes.'
+
+    def handle(self, *args, **options):
+        if get_backend() is None:
+            raise CommandError(
+                f'Full-text search is not supported by {connection.vendor}.'
+            )
+        with transaction.atomic():
+            install_search_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt!'))
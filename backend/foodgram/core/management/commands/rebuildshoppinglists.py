@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized shopping lists from users\' carts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report drift without changing anything.'
+        )
+
+    def handle(self, *args, **options):
+        expected = ShoppingCartIngredient.objects.aggregate_from_carts()
+        actual = {
+            (row['user_id'], row['ingredient_id']): row['amount']
+            for row in ShoppingCartIngredient.objects.values(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        drift = {
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        }
+        if options['verify']:
+            if drift:
+                raise CommandError(
+                    f'Shopping lists drift found in {len(drift)} rows.'
+                )
+            self.stdout.write(self.style.SUCCESS('Shopping lists are valid!'))
+            return
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.all().delete()
+            ShoppingCartIngredient.objects.bulk_create([
+                ShoppingCartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for (user_id, ingredient_id), amount in expected.items()
+            ])
+        self.stdout.write(self.style.SUCCESS(
+            f'Shopping lists rebuilt, {len(drift)} rows repaired!'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import reconcile_counters
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Repair drift of denormalized recipes and users counters '
+        'and recipes tag masks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report drift without changing anything.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_counters(
+                Recipe, User, dry_run=options['verify']
+            )
+        for counter, rows in drift.items():
+            self.stdout.write(f'{counter}: {rows} drifted rows')
+        if options['verify'] and any(drift.values()):
+            raise CommandError('Counters drift found.')
+        self.stdout.write(self.style.SUCCESS(
+            'Counters are valid!' if options['verify']
+            else 'Counters reconciled!'
+        ))
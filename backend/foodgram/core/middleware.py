@@ -0,0 +1,431 @@
+import asyncio
+import cProfile
+import gzip
+import hashlib
+import logging
+import os
+import re
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from io import BytesIO
+from threading import local
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.serializers import BaseSerializer
+
+from .authentication import CachedTokenAuthentication
+from .lru import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SQL_LITERALS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+SQL_LISTS_RE = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+_state = local()
+
+
+def normalize_sql(sql):
+    """Replace literals and placeholders with '?' and collapse lists,
+    so statements differing only by parameters have the same shape.
+    """
+    return SQL_LISTS_RE.sub('(...)', SQL_LITERALS_RE.sub('?', sql))
+
+
+class RequestStats:
+    """SQL statements and serialization time of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = list()
+        self.serializer_time = 0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Signature of connection.execute_wrapper() wrappers.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def get_repeated(self, threshold):
+        shapes = Counter(normalize_sql(sql) for sql, _ in self.queries)
+        return [
+            (shape, count) for shape, count in shapes.most_common()
+            if count > threshold
+        ]
+
+    def get_slowest(self, number):
+        return sorted(
+            self.queries, key=lambda query: query[1], reverse=True
+        )[:number]
+
+    def get_shape_times(self):
+        times = defaultdict(float)
+        for sql, duration in self.queries:
+            times[normalize_sql(sql)] += duration
+        return times
+
+
+def timed_data(data_property):
+    """Wrap BaseSerializer.data to sum the time of outermost
+    serializers only, nested ones are a part of it.
+    """
+    def data(serializer):
+        stats = getattr(_state, 'stats', None)
+        if stats is None:
+            return data_property.fget(serializer)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data_property.fget(serializer)
+        finally:
+            stats.serializer_depth -= 1
+            if not stats.serializer_depth:
+                stats.serializer_time += time.perf_counter() - started
+    data.timed = True
+    return property(data)
+
+
+def install_serializer_timer():
+    if not getattr(BaseSerializer.data.fget, 'timed', False):
+        BaseSerializer.data = timed_data(BaseSerializer.data)
+
+
+def mark_async(middleware, get_response):
+    """Make the middleware instance a coroutine function for Django
+    when the rest of the chain is async, as MiddlewareMixin does.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        middleware._is_coroutine = asyncio.coroutines._is_coroutine
+        return True
+    return False
+
+
+class SQLInstrumentationMiddleware:
+    """Record number and time of SQL queries and serialization time
+    of every request, add them to 'Server-Timing' header and log slow
+    requests, slow queries and repeated statements (N+1 queries).
+
+    Enabled by SQL_INSTRUMENTATION['ENABLED'], otherwise Django drops
+    the middleware on startup and it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        self.config = settings.SQL_INSTRUMENTATION
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        install_serializer_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _state.stats = stats
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _state.stats = None
+        if self.config['SERVER_TIMING']:
+            response['Server-Timing'] = self.get_server_timing(stats)
+        self.report(request, stats)
+        return response
+
+    def get_server_timing(self, stats):
+        return ', '.join((
+            f'db;dur={stats.sql_time * 1000:.2f};'
+            f'desc="{len(stats.queries)} queries"',
+            f'serializer;dur={stats.serializer_time * 1000:.2f}',
+            f'total;dur={stats.total_time * 1000:.2f}',
+        ))
+
+    def report(self, request, stats):
+        config = self.config
+        total_ms = stats.total_time * 1000
+        request_name = f'{request.method} {request.get_full_path()}'
+        if (
+                total_ms > config['SLOW_REQUEST_MS']
+                or len(stats.queries) > config['MAX_QUERIES']
+        ):
+            shape_times = stats.get_shape_times()
+            top = sorted(
+                shape_times.items(), key=lambda item: item[1], reverse=True
+            )[:config['TOP_QUERIES']]
+            logger.warning(
+                'Slow request %s: %.1fms total, %d queries in %.1fms, '
+                'serializer %.1fms. Top statements:\n%s',
+                request_name, total_ms, len(stats.queries),
+                stats.sql_time * 1000, stats.serializer_time * 1000,
+                '\n'.join(
+                    f'{duration * 1000:.1f}ms {shape}'
+                    for shape, duration in top
+                )
+            )
+        for sql, duration in stats.get_slowest(config['TOP_QUERIES']):
+            if duration * 1000 <= config['SLOW_QUERY_MS']:
+                break
+            logger.warning(
+                'Slow query in %s: %.1fms %s',
+                request_name, duration * 1000, normalize_sql(sql)
+            )
+        for shape, count in stats.get_repeated(config['N_PLUS_ONE_LIMIT']):
+            logger.warning(
+                'Possible N+1 queries in %s: %d times %s',
+                request_name, count, shape
+            )
+
+
+class ProfilingMiddleware:
+    """Profile the request of a staff user sent with 'X-Profile'
+    header or '_profile' query param. cProfile stats and, for
+    'memory' value, tracemalloc snapshot are saved to
+    PROFILING['DIRECTORY'], id of the files is returned in
+    'X-Profile-Id' header. Number of profiles per user is limited.
+    """
+    header = 'HTTP_X_PROFILE'
+    query_param = '_profile'
+    memory_value = 'memory'
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = settings.PROFILING
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = mark_async(self, get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = self.get_mode(request)
+        if not mode:
+            return self.get_response(request)
+        return self.handle(request, mode, self.get_response)
+
+    async def __acall__(self, request):
+        mode = self.get_mode(request)
+        if not mode:
+            return await self.get_response(request)
+        # Profiled requests are rare, they are handled by the sync
+        # code in a thread, the profiler sees the sync view there.
+        return await sync_to_async(self.handle)(
+            request, mode, async_to_sync(self.get_response)
+        )
+
+    def get_mode(self, request):
+        return request.META.get(self.header) or request.GET.get(
+            self.query_param
+        )
+
+    def handle(self, request, mode, get_response):
+        user = self.get_user(request)
+        if user is None or not user.is_staff:
+            return get_response(request)
+        if not self.allow(user):
+            response = get_response(request)
+            response['X-Profile-Error'] = 'Profiling rate limit exceeded.'
+            return response
+        return self.profile(request, mode == self.memory_value, get_response)
+
+    def get_user(self, request):
+        # Token authentication of DRF runs in views, after middlewares.
+        try:
+            authenticated = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if authenticated is not None:
+            return authenticated[0]
+        user = getattr(request, 'user', None)
+        return user if user is not None and user.is_authenticated else None
+
+    def allow(self, user):
+        key = f'profiling:{user.pk}'
+        cache.add(key, 0, self.config['RATE_PERIOD'])
+        try:
+            return cache.incr(key) <= self.config['RATE_LIMIT']
+        except ValueError:
+            # Key has expired between add() and incr().
+            return True
+
+    def profile(self, request, trace_memory, get_response):
+        profile_id = uuid.uuid4().hex
+        directory = self.config['DIRECTORY']
+        os.makedirs(directory, exist_ok=True)
+        # tracemalloc is process wide, it's not started twice
+        # by concurrent requests.
+        trace_memory = trace_memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start(self.config['TRACEMALLOC_FRAMES'])
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+            if trace_memory:
+                tracemalloc.take_snapshot().dump(
+                    os.path.join(directory, f'{profile_id}.tracemalloc')
+                )
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        profiler.dump_stats(os.path.join(directory, f'{profile_id}.pstats'))
+        logger.info(
+            'Request %s %s profiled as %s',
+            request.method, request.get_full_path(), profile_id
+        )
+        response['X-Profile-Id'] = profile_id
+        return response
+
+
+def gzip_compress(content, level):
+    # gzip.compress() has no 'mtime' argument before Python 3.8,
+    # fixed mtime keeps the output the same for the same content.
+    buffer = BytesIO()
+    with gzip.GzipFile(
+            mode='wb', compresslevel=level, fileobj=buffer, mtime=0
+    ) as file:
+        file.write(content)
+    return buffer.getvalue()
+
+
+def parse_accept_encoding(header):
+    """Return {coding: quality} of Accept-Encoding header."""
+    codings = dict()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+class CompressionMiddleware:
+    """Compress API responses larger than COMPRESSION['MIN_SIZE']
+    with brotli, when the 'brotli' package is installed, or gzip,
+    whichever the client prefers in Accept-Encoding.
+
+    Only COMPRESSION['CONTENT_TYPES'] under COMPRESSION['PATHS'] are
+    compressed. Streaming responses (shopping list exports) are left
+    as they are. Cached API responses repeat the same bodies, so
+    compressed bodies are kept in a small in-process LRU cache by
+    the hash of the content.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = settings.COMPRESSION
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.codings = {'gzip': self.compress_gzip}
+        if brotli is not None:
+            self.codings['br'] = self.compress_brotli
+        self.compressed = LRUCache(
+            self.config['CACHE_SIZE'], self.config['CACHE_TTL']
+        )
+        self.get_response = get_response
+        self.is_async = mark_async(self, get_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if not self.is_compressible(request, response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+        content = self.compress(coding, response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = coding
+        # Compressed body is not byte equal to the original one,
+        # strong ETag must become weak (RFC 7232 section 2.1).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def is_compressible(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if not request.path.startswith(tuple(self.config['PATHS'])):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        return (
+            content_type.strip() in self.config['CONTENT_TYPES']
+            and len(response.content) >= self.config['MIN_SIZE']
+        )
+
+    def negotiate(self, header):
+        """Return the supported coding of the highest quality,
+        brotli wins ties as it's smaller for the same CPU time.
+        """
+        accepted = parse_accept_encoding(header)
+        default = accepted.get('*', 0.0)
+        best, best_quality = None, 0.0
+        for coding in ('br', 'gzip'):
+            if coding not in self.codings:
+                continue
+            quality = accepted.get(coding, default)
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def compress(self, coding, content):
+        key = (coding, hashlib.md5(content).digest())
+        compressed = self.compressed.get(key)
+        if compressed is None:
+            compressed = self.codings[coding](content)
+            self.compressed.set(key, compressed)
+        return compressed
+
+    def compress_gzip(self, content):
+        return gzip_compress(content, self.config['GZIP_LEVEL'])
+
+    def compress_brotli(self, content):
+        return brotli.compress(content, quality=self.config['BROTLI_QUALITY'])
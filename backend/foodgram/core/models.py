@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+
+class DataVersion(models.Model):
+    """Class that represents number of changes of the named data,
+    ETags and keys of cached responses are derived from it.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Название'
+    )
+    number = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Номер изменения'
+    )
+    modified = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Время изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.name} {self.number}'
+
+
+class CountersMixin:
+    """Model mixin keeping 'counter_fields', shifted by atomic queryset
+    updates, out of saves of existing rows unless 'update_fields' names
+    them, so a stale instance doesn't write old counts back.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+                not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,48 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer serializing with orjson when it's installed.
+
+    Output is the same as of the stdlib renderer: types orjson doesn't
+    handle natively, datetimes included, are passed to DRF encoder.
+    Indented output (browsable API, 'indent' media type param) and
+    non-default JSON settings fall back to the stdlib json.
+    """
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+                orjson is None or data is None
+                or self.ensure_ascii or not self.compact
+                or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            rendered = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            # Integers over 64 bits and the like are left to stdlib.
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Same escaping of line terminators as JSONRenderer does.
+        if b'\xe2\x80\xa8' in rendered or b'\xe2\x80\xa9' in rendered:
+            rendered = rendered.replace(
+                b'\xe2\x80\xa8', b'\\u2028'
+            ).replace(b'\xe2\x80\xa9', b'\\u2029')
+        return rendered
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .connections import (check_connections, connection_stats,
+                          mark_connections_used)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    # Password change and deactivation are saves of the user.
+    if not created:
+        invalidate_user_tokens(instance.pk)
+
+
+# Connected after close_old_connections() of Django, which closes
+# expired connections first.
+@receiver(request_started)
+def request_started_handler(sender, **kwargs):
+    check_connections()
+
+
+@receiver(request_finished)
+def request_finished_handler(sender, **kwargs):
+    mark_connections_used()
+
+
+@receiver(connection_created)
+def connection_created_handler(sender, connection, **kwargs):
+    connection_stats[f'{connection.alias}.created'] += 1
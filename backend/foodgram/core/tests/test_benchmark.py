@@ -0,0 +1,33 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from core.benchmark import DATASETS, Scenarios, seed
+
+
+class BenchmarkScenariosTest(TestCase):
+    """Every scenario runs on datasets smaller than the number
+    of followers, favorites and cart recipes per user.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_small_dataset(self):
+        params = dict(DATASETS['small'], users=10, recipes=3, ingredients=5)
+        user = seed(params)
+        for name, run in Scenarios(user).get_all().items():
+            with self.subTest(name):
+                self.assertLess(run().status_code, 400)
+
+    def test_minimal_dataset(self):
+        params = dict(DATASETS['small'], users=2, recipes=1, ingredients=1)
+        user = seed(params)
+        for name, run in Scenarios(user).get_all().items():
+            with self.subTest(name):
+                self.assertLess(run().status_code, 400)
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import SimpleTestCase, override_settings
+
+from core.connections import (check_connections, connection_stats,
+                              warm_up_connections)
+
+
+def get_connection(usable=True, conn_max_age=60):
+    connection = mock.Mock(
+        alias='test', connection=object(), in_atomic_block=False,
+        settings_dict={'CONN_MAX_AGE': conn_max_age}
+    )
+    connection.is_usable.return_value = usable
+    return connection
+
+
+@override_settings(DATABASE_CONNECTIONS={'HEALTH_CHECK_INTERVAL': 30})
+class ConnectionsTest(SimpleTestCase):
+    """Health checks and warm-up of persistent connections."""
+
+    def setUp(self):
+        connection_stats.clear()
+        self.addCleanup(connection_stats.clear)
+
+    def check(self, connection):
+        with mock.patch('core.connections.connections') as connections:
+            connections.all.return_value = [connection]
+            check_connections()
+
+    def warm_up(self, connection):
+        with mock.patch('core.connections.connections') as connections:
+            connections.all.return_value = [connection]
+            warm_up_connections()
+
+    def test_broken_connection_closed(self):
+        connection = get_connection(usable=False)
+        with mock.patch('time.monotonic', return_value=100):
+            connection.last_used = 0
+            self.check(connection)
+        connection.close.assert_called_once()
+        self.assertEqual(connection_stats['test.unhealthy'], 1)
+
+    def test_recently_used_connection_not_checked(self):
+        connection = get_connection(usable=False)
+        with mock.patch('time.monotonic', return_value=100):
+            connection.last_used = 90
+            self.check(connection)
+        connection.is_usable.assert_not_called()
+        connection.close.assert_not_called()
+
+    def test_usable_connection_kept(self):
+        connection = get_connection()
+        with mock.patch('time.monotonic', return_value=100):
+            connection.last_used = 0
+            self.check(connection)
+        connection.close.assert_not_called()
+        self.assertEqual(connection_stats['test.health_checks'], 1)
+
+    def test_warm_up(self):
+        connection = get_connection()
+        self.warm_up(connection)
+        connection.ensure_connection.assert_called_once()
+
+    def test_warm_up_skips_closed_per_request(self):
+        connection = get_connection(conn_max_age=0)
+        self.warm_up(connection)
+        connection.ensure_connection.assert_not_called()
+
+    def test_warm_up_failure_logged(self):
+        connection = get_connection()
+        connection.ensure_connection.side_effect = DatabaseError('down')
+        with self.assertLogs('core.connections', 'WARNING'):
+            self.warm_up(connection)
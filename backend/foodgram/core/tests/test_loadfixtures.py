@@ -0,0 +1,50 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.management.commands.loadfixtures import iterate_json_array
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient
+
+
+class LoadFixturesTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'ingredients.json'
+        self.path.write_text(json.dumps([
+            {'name': 'картофель', 'measurement_unit': 'г'},
+            {'name': 'молоко', 'measurement_unit': 'мл'},
+        ]), encoding='utf-8')
+
+    def load(self):
+        call_command('loadfixtures', str(self.path), stdout=io.StringIO())
+
+    def test_json_array_is_read_by_chunks(self):
+        text = '[{"name": "соль", "id": [1, 2]}, 12345, "a,]" ]'
+        for chunk_size in (1, 2, 7, 1024):
+            self.assertEqual(
+                list(iterate_json_array(io.StringIO(text), chunk_size)),
+                json.loads(text)
+            )
+
+    def test_load_skips_existing(self):
+        self.load()
+        self.load()
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measure')),
+            {('картофель', 'г'), ('молоко', 'мл')}
+        )
+
+    def test_load_refreshes_ingredient_index(self):
+        self.assertEqual(ingredient_index.search('карт'), [])
+        self.load()
+        found = ingredient_index.search('карт')
+        self.assertEqual(
+            [ingredient.name for ingredient in found], ['картофель']
+        )
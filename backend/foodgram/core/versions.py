@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.timezone import now
+
+from .models import DataVersion
+
+VERSION_KEY_PREFIX = 'version'
+CATALOGUE_VERSION = 'catalogue'
+RECIPES_VERSION = 'recipes'
+
+
+def get_version(name):
+    """Return (token, timestamp) of the named data version.
+
+    Versions are stored in the database, so every process derives
+    the same token and the timestamp is of the last change. They are
+    cached for VERSION_TTL seconds, with a per-process cache backend
+    bumps of other processes are seen at most that late.
+    """
+    key = f'{VERSION_KEY_PREFIX}:{name}'
+    version = cache.get(key)
+    if version is None:
+        version = load_version(name)
+        cache.set(key, version, settings.VERSION_TTL)
+    return version
+
+
+def load_version(name):
+    data_version, _ = DataVersion.objects.get_or_create(name=name)
+    timestamp = int(data_version.modified.timestamp())
+    return f'{data_version.number}-{timestamp}', timestamp
+
+
+def bump_version(name):
+    """Count a change of the named data. Call it after commit,
+    otherwise concurrent request could cache the old data under
+    the new version.
+    """
+    DataVersion.objects.get_or_create(name=name)
+    DataVersion.objects.filter(name=name).update(
+        number=F('number') + 1, modified=now()
+    )
+    cache.delete(f'{VERSION_KEY_PREFIX}:{name}')
+
+
+def version_etag(name):
+    def etag_func(request, *args, **kwargs):
+        return get_version(name)[0]
+    return etag_func
+
+
+def version_last_modified(name):
+    def last_modified_func(request, *args, **kwargs):
+        return datetime.fromtimestamp(get_version(name)[1], tz=timezone.utc)
+    return last_modified_func
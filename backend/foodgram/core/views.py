@@ -0,0 +1,18 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .authentication import token_cache
+from .connections import get_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def auth_cache_stats(request):
+    return Response(token_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_stats(request):
+    return Response(get_stats())
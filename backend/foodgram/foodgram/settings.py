@@ -54,12 +54,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.SQLInstrumentationMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -95,10 +98,37 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'password'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', '5432')
+        'PORT': os.getenv('DB_PORT', '5432'),
+        # Seconds to keep a connection open, 0 closes it after
+        # every request.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Persistent connections idle longer than HEALTH_CHECK_INTERVAL seconds
+# are checked before a request uses them.
+DATABASE_CONNECTIONS = {
+    'HEALTH_CHECK_INTERVAL': 30,
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+# Data versions (ETags of the catalogue, keys of cached recipe
+# responses) are stored in the database and cached in the default cache
+# for VERSION_TTL seconds. LocMemCache is per process, so with several
+# workers a change is seen by other workers only when their cached
+# version expires. Set CACHE_BACKEND to a shared backend (memcached,
+# redis, database) and VERSION_TTL=0 (no expiry) to see changes at once
+# everywhere.
+VERSION_TTL = int(os.getenv('VERSION_TTL', 60)) or None
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -149,11 +179,69 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS':
         'api.paginators.CustomPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+PAGINATION_COUNT_CACHE_TTL = 30
+
+# Recipe responses are dropped by RECIPES_VERSION bumped by signals
+# of recipes, their tags, ingredients and author fields. Favorite and
+# cart counters are shifted by queryset updates without the bump, so
+# lists ordered by them may lag behind for up to RECIPE_CACHE_TTL.
+# Other queryset updates of these data must bump the version.
+RECIPE_CACHE_TTL = int(os.getenv('RECIPE_CACHE_TTL', 5 * 60))
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', 60)),
+    'USE_DJANGO_CACHE': os.getenv('TOKEN_AUTH_USE_DJANGO_CACHE') == 'True',
+}
+
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.getenv('SQL_INSTRUMENTATION') == 'True',
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', 500)),
+    'SLOW_QUERY_MS': int(os.getenv('SLOW_QUERY_MS', 100)),
+    'MAX_QUERIES': 30,
+    'N_PLUS_ONE_LIMIT': 5,
+    'TOP_QUERIES': 5,
+}
+
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING') == 'True',
+    'DIRECTORY': os.getenv('PROFILING_DIR', '/tmp/foodgram-profiles'),
+    'RATE_LIMIT': 10,
+    'RATE_PERIOD': 60 * 60,
+    'TRACEMALLOC_FRAMES': 10,
+}
+
+# Brotli is used only when the 'brotli' package is installed.
+COMPRESSION = {
+    'ENABLED': os.getenv('COMPRESSION', 'True') == 'True',
+    'PATHS': ('/api/',),
+    'CONTENT_TYPES': ('application/json', 'text/plain', 'text/csv'),
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CACHE_SIZE': 256,
+    'CACHE_TTL': 5 * 60,
+}
+
+# Enabled by foodgram/asgi.py: safe requests of BASENAMES endpoints
+# are served by async views running DRF on a pool of THREADS threads.
+# SQL_INSTRUMENTATION only sees queries of the request thread then.
+ASYNC_VIEWS = {
+    'ENABLED': os.getenv('ASYNC_VIEWS', 'False') == 'True',
+    'THREADS': int(os.getenv('ASYNC_VIEWS_THREADS', 8)),
+    'BASENAMES': ('recipes', 'tags', 'ingredients'),
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -162,4 +250,23 @@ CORS_ALLOWED_ORIGINS = [
 
 USE_X_FORWARDED_HOST = True
 
-FILE_UPLOAD_MAX_MEMORY_SIZE = 50000000
+# Bigger uploads are streamed to temporary files instead of memory.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_DIMENSION = 6000
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+SHOPPING_LIST_PDF_MAX_MEMORY_SIZE = 1024 * 1024
+
+INGREDIENT_INDEX_TTL = 300
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+IMAGE_RENDITION_FORMATS = ('webp', 'jpeg')
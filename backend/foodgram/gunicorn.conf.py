@@ -0,0 +1,7 @@
+"""gunicorn settings read from the working directory on start."""
+
+
+def post_worker_init(worker):
+    # Application is loaded, connect before the first request.
+    from core.connections import warm_up_connections
+    warm_up_connections()
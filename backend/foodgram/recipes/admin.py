@@ -1,27 +1,49 @@
 from django.contrib import admin
+from django.db.models import Q
+
+from core.admin import InputFilter
 from .models import Ingredient, Recipe, Tag
 
 
+class AuthorFilter(InputFilter):
+    title = 'автору (username или email)'
+    parameter_name = 'author'
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            return queryset.filter(
+                Q(author__username=value) | Q(author__email=value)
+            )
+        return queryset
+
+
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ['name', 'author', 'created', 'number_of_additions']
-    search_fields = ['name', 'author__username', '^tags__name']
-    list_filter = ['author', 'name', 'tags']
-    readonly_fields = ['number_of_additions']
+    list_display = [
+        'name', 'author', 'created', 'number_of_additions', 'favorites_count'
+    ]
+    list_select_related = ['author']
+    search_fields = ['^name', '=author__username', '=author__email']
+    list_filter = [AuthorFilter, 'tags']
+    readonly_fields = ['number_of_additions', 'favorites_count']
+    autocomplete_fields = ['author', 'shopping_users', 'favorited_users']
+    show_full_result_count = False
 
     def number_of_additions(self, obj: Recipe):
-        return len(obj.shopping_users.all())
+        return obj.shopping_count
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'measure']
-    search_fields = ['name', 'measure']
-    list_filter = ['name', ]
+    search_fields = ['^name']
+    list_filter = ['measure', ]
+    show_full_result_count = False
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ['name', 'color', 'slug']
-    search_fields = ['name', 'colow', 'slug']
+    search_fields = ['name', 'color', 'slug']
     list_filter = ['name', 'color', 'slug']
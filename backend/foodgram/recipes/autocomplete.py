@@ -0,0 +1,131 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from django.conf import settings
+
+from core.versions import CATALOGUE_VERSION, get_version
+from .models import Ingredient
+
+NGRAM_SIZE = 3
+
+
+def fold(value):
+    """Normalize the string for case and 'ё' insensitive matching."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Per-process in-memory index for ingredient autocomplete.
+
+    Index is built lazily on the first search and is dropped
+    by Ingredient signals, on change of CATALOGUE_VERSION, so bulk
+    loads and changes made by other processes are picked up too,
+    or after 'INGREDIENT_INDEX_TTL' seconds. The built
+    index is published as one snapshot tuple, so searches of other
+    threads see either the old or the new index as a whole.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # (built_at, version, entries, keys, ngrams) or None.
+        self._snapshot = None
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _is_stale(self, snapshot):
+        ttl = settings.INGREDIENT_INDEX_TTL
+        return (
+            snapshot is None
+            or ttl is not None and time.monotonic() - snapshot[0] > ttl
+            or snapshot[1] != get_version(CATALOGUE_VERSION)[0]
+        )
+
+    def _build(self):
+        # Version is read first, a change during the build makes
+        # the index stale at once.
+        version = get_version(CATALOGUE_VERSION)[0]
+        entries = sorted(
+            (fold(name), pk, name, measure)
+            for pk, name, measure in Ingredient.objects.values_list(
+                'pk', 'name', 'measure'
+            )
+        )
+        ngrams = dict()
+        for position, entry in enumerate(entries):
+            key = entry[0]
+            for start in range(len(key) - NGRAM_SIZE + 1):
+                positions = ngrams.setdefault(
+                    key[start:start + NGRAM_SIZE], []
+                )
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+        return (
+            time.monotonic(),
+            version,
+            tuple(entries),
+            tuple(entry[0] for entry in entries),
+            ngrams,
+        )
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if self._is_stale(snapshot):
+            with self._lock:
+                snapshot = self._snapshot
+                if self._is_stale(snapshot):
+                    snapshot = self._build()
+                    self._snapshot = snapshot
+        return snapshot
+
+    def _substring_candidates(self, query, entries, ngrams):
+        if len(query) < NGRAM_SIZE:
+            return range(len(entries))
+        postings = list()
+        for start in range(len(query) - NGRAM_SIZE + 1):
+            positions = ngrams.get(query[start:start + NGRAM_SIZE])
+            if not positions:
+                return []
+            postings.append(positions)
+        # Intersection starts from the rarest n-gram to keep sets small.
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def search(self, query, limit=None):
+        """Return ingredients matching the query: ones starting with it
+        go first, then ones containing it.
+        """
+        _, _, entries, keys, ngrams = self._get_snapshot()
+        query = fold(query)
+        found = list()
+        start = bisect_left(keys, query)
+        position = start
+        while (
+                position < len(keys) and keys[position].startswith(query)
+                and (limit is None or len(found) < limit)
+        ):
+            found.append(entries[position])
+            position += 1
+        if limit is None or len(found) < limit:
+            for candidate in self._substring_candidates(
+                    query, entries, ngrams
+            ):
+                if start <= candidate < position:
+                    continue
+                if query in keys[candidate]:
+                    found.append(entries[candidate])
+                    if limit is not None and len(found) >= limit:
+                        break
+        return [
+            Ingredient(pk=pk, name=name, measure=measure)
+            for _, pk, name, measure in found[:limit]
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,84 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import (BigIntegerField, Count, ExpressionWrapper, F,
+                              OuterRef, Subquery, Sum, Value)
+from django.db.models.functions import Cast, Coalesce
+
+from core.versions import RECIPES_VERSION, bump_version
+
+
+def count_subquery(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), Value(0))
+
+
+def tags_mask_subquery(queryset):
+    """Sum of distinct tag bits is the same as their bitwise OR."""
+    return Coalesce(Subquery(
+        queryset.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(total=Sum(
+            ExpressionWrapper(
+                Cast(Value(1), BigIntegerField()).bitleftshift(
+                    F('tag__bit')
+                ),
+                output_field=BigIntegerField()
+            ),
+            distinct=True
+        )).values('total')
+    ), Value(0))
+
+
+def update_tags_masks(recipe_model, recipe_ids):
+    """Recompute tags masks of the recipes, for writes of their tags
+    sending no signals: bulk_create() and add() of the relation.
+    """
+    recipe_model.objects.filter(pk__in=recipe_ids).update(
+        tags_mask=tags_mask_subquery(recipe_model.tags.through.objects)
+    )
+
+
+def get_counters(recipe_model, user_model):
+    """Return (model, counter field, actual value expression)
+    of every denormalized counter.
+    """
+    return [
+        (recipe_model, 'favorites_count', count_subquery(
+            recipe_model.favorited_users.through.objects, 'recipe'
+        )),
+        (recipe_model, 'shopping_count', count_subquery(
+            recipe_model.shopping_users.through.objects, 'recipe'
+        )),
+        (user_model, 'recipes_count', count_subquery(
+            recipe_model.objects, 'author'
+        )),
+        (user_model, 'subscribers_count', count_subquery(
+            user_model.subscriptions.through.objects, 'to_user'
+        )),
+        (recipe_model, 'tags_mask', tags_mask_subquery(
+            recipe_model.tags.through.objects
+        )),
+    ]
+
+
+def reconcile_counters(recipe_model, user_model, dry_run=False):
+    """Repair drifted counters and return number of drifted rows
+    by counter name.
+    """
+    drift = dict()
+    for model, field, actual in get_counters(recipe_model, user_model):
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        )
+        drift[f'{model.__name__}.{field}'] = drifted.count()
+        if not dry_run and drift[f'{model.__name__}.{field}']:
+            model.objects.update(**{field: actual})
+    if not dry_run and any(drift.values()):
+        # Queryset updates send no signals, cached recipe lists
+        # ordered by the counters are dropped after commit here.
+        transaction.on_commit(partial(bump_version, RECIPES_VERSION))
+    return drift
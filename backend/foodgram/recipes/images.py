@@ -0,0 +1,158 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.versions import RECIPES_VERSION, bump_version
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'recipes/images/renditions/'
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+             'progressive': True},
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='image-processing'
+)
+
+
+def encode(image, extension):
+    if extension == 'jpeg' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    buffer = BytesIO()
+    # Image is saved without 'exif' argument, so metadata is stripped.
+    image.save(buffer, **SAVE_OPTIONS[extension])
+    return buffer.getvalue()
+
+
+def get_rendition_name(image_name, size_name, extension):
+    # Original names are unique in the storage, so are renditions
+    # names, reprocessing overwrites the files instead of adding ones.
+    base = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_DIR}{base}_{size_name}.{extension}'
+
+
+def iterate_renditions(renditions):
+    for formats in (renditions or {}).values():
+        yield from formats.values()
+
+
+def delete_renditions(renditions):
+    for name in iterate_renditions(renditions):
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Failed to delete rendition %s', name)
+
+
+def schedule_renditions_deletion(renditions):
+    """Delete files of replaced or deleted image after commit."""
+    if renditions:
+        transaction.on_commit(lambda: delete_renditions(renditions))
+
+
+def save_rendition(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def make_renditions(image_name):
+    """Save resized copies of the image in every configured
+    size and format and return their storage names.
+    """
+    with default_storage.open(image_name) as file:
+        original = Image.open(file)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    renditions = dict()
+    for size_name, size in settings.IMAGE_RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        renditions[size_name] = {
+            extension: save_rendition(
+                get_rendition_name(image_name, size_name, extension),
+                encode(image, extension)
+            )
+            for extension in settings.IMAGE_RENDITION_FORMATS
+        }
+    return renditions
+
+
+def process_recipe_image(recipe_id, image_name):
+    try:
+        renditions = make_renditions(image_name)
+    except Exception:
+        logger.exception('Image processing failed for recipe %s', recipe_id)
+        return
+    # Filtering by image skips the result if the image
+    # has been replaced while it was processed.
+    if Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_renditions=renditions
+    ):
+        bump_version(RECIPES_VERSION)
+    else:
+        delete_renditions(renditions)
+
+
+def delete_orphan_renditions(min_age=timedelta(hours=1)):
+    """Delete rendition files no recipe refers to and return their
+    number. Recent files may belong to images being processed.
+    """
+    if not default_storage.exists(RENDITIONS_DIR):
+        return 0
+    used = set()
+    for renditions in Recipe.objects.values_list(
+            'image_renditions', flat=True
+    ).iterator():
+        used.update(iterate_renditions(renditions))
+    threshold = timezone.now() - min_age
+    deleted = 0
+    for file_name in default_storage.listdir(RENDITIONS_DIR)[1]:
+        name = f'{RENDITIONS_DIR}{file_name}'
+        if (
+                name not in used
+                and default_storage.get_modified_time(name) < threshold
+        ):
+            default_storage.delete(name)
+            deleted += 1
+    return deleted
+
+
+def process_in_worker(recipe_id, image_name):
+    try:
+        process_recipe_image(recipe_id, image_name)
+    except Exception:
+        logger.exception('Image processing failed for recipe %s', recipe_id)
+    finally:
+        # Worker threads own their DB connections.
+        connection.close()
+
+
+def schedule_image_processing(recipe):
+    """Process the recipe image in the background after commit."""
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(process_in_worker, recipe_id, image_name)
+    )
@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Coalesce
+
+
+def fill_tags_mask(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for bit, tag in enumerate(Tag.objects.order_by('pk')):
+        if bit >= 63:
+            raise ValueError('Number of tags cannot exceed 63.')
+        tag.bit = bit
+        tag.save(update_fields=['bit'])
+    Recipe.objects.update(tags_mask=Coalesce(models.Subquery(
+        Recipe.tags.through.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe').annotate(total=models.Sum(
+            models.ExpressionWrapper(
+                Cast(models.Value(1), models.BigIntegerField()).bitleftshift(
+                    models.F('tag__bit')
+                ),
+                output_field=models.BigIntegerField()
+            ),
+            distinct=True
+        )).values('total')
+    ), models.Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тэгов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Бит в маске тэгов рецепта'),
+        ),
+        migrations.RunPython(fill_tags_mask, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, unique=True, verbose_name='Бит в маске тэгов рецепта'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 17:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ['color'], 'verbose_name': 'Тэг', 'verbose_name_plural': 'Тэги'},
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from core.indexes import upper_pattern_index
+
+
+class Migration(migrations.Migration):
+    """Indexes of '^name' admin search of recipes and ingredients."""
+
+    dependencies = [
+        ('recipes', '0017_alter_tag_options'),
+    ]
+
+    operations = [
+        upper_pattern_index(
+            'recipes.Recipe', 'name', 'recipe_name_upper_like_idx'
+        ),
+        upper_pattern_index(
+            'recipes.Ingredient', 'name', 'ingredient_name_upper_like_idx'
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+
+from core.models import CountersMixin
 from users.models import User
 
 
@@ -24,6 +31,10 @@ class Ingredient(models.Model):
         return f'{self.name} {self.measure}'
 
 
+# Bits of the signed 64-bit Recipe.tags_mask available for tags.
+TAG_MASK_BITS = 63
+
+
 class Tag(models.Model):
     """Class that represents Tags model."""
     name = models.CharField(
@@ -39,6 +50,11 @@ class Tag(models.Model):
     slug = models.SlugField(
         unique=True,
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True,
+        editable=False,
+        verbose_name='Бит в маске тэгов рецепта'
+    )
 
     class Meta:
         ordering = ['color']
@@ -48,8 +64,36 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def mask(self):
+        return 1 << self.bit
+
+    @classmethod
+    def get_free_bit(cls):
+        used = set(cls.objects.values_list('bit', flat=True))
+        for bit in range(TAG_MASK_BITS):
+            if bit not in used:
+                return bit
+        raise ValidationError(
+            f'Number of tags cannot exceed {TAG_MASK_BITS}.'
+        )
+
+    def clean(self):
+        if self.bit is None:
+            self.get_free_bit()
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            self.bit = self.get_free_bit()
+        super().save(*args, **kwargs)
+
+
+def get_tags_mask(tags):
+    """Return bitmask of the tags for Recipe.tags_mask."""
+    return reduce(or_, (tag.mask for tag in tags), 0)
+
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     """Class that represents Recipes model."""
     author = models.ForeignKey(
         User,
@@ -66,6 +110,11 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Картинка',
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Уменьшенные копии картинки'
+    )
     text = models.TextField(
         verbose_name='Описание'
     )
@@ -99,14 +148,38 @@ class Recipe(models.Model):
         verbose_name='Пользователи, которые добавили рецепт в избранное',
         related_name='favorited'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавлений в избранное'
+    )
+    shopping_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавлений в корзину'
+    )
+    # Denormalized tags, filtering by them doesn't need joins.
+    tags_mask = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Маска тэгов'
+    )
+
+    # Tags mask is kept by TagRecipe signals like the counters.
+    counter_fields = ('favorites_count', 'shopping_count', 'tags_mask')
 
     class Meta:
-        # Ordering meta param also redefines while
-        # one of view functions' method works. If redefine here check
-        # api/views.py RecipeViewSet method 'download_shopping_cart'.
-        ordering = ['-created']
+        ordering = ['-created', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-created', '-id'],
+                name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-created'],
+                name='recipe_popular_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'name'],
@@ -153,3 +226,114 @@ class TagRecipe(models.Model):
 
     def __str__(self):
         return f'{self.tag} {self.recipe}'
+
+
+class ShoppingCartIngredientManager(models.Manager):
+    """Manager that keeps per-user ingredient totals in sync
+    with the recipes in users' shopping carts.
+    """
+
+    def apply_delta(self, user_ids, ingredient_deltas):
+        """Add 'ingredient_deltas' ({ingredient_id: amount}) to the
+        shopping lists of every user from 'user_ids'.
+        """
+        user_ids = list(user_ids)
+        ingredient_deltas = {
+            pk: delta for pk, delta in ingredient_deltas.items() if delta
+        }
+        if not user_ids or not ingredient_deltas:
+            return
+        with transaction.atomic():
+            rows = self.filter(
+                user_id__in=user_ids,
+                ingredient_id__in=ingredient_deltas
+            )
+            existing = set(rows.select_for_update().values_list(
+                'user_id', 'ingredient_id'
+            ))
+            if existing:
+                rows.update(amount=F('amount') + Case(
+                    *[When(ingredient_id=pk, then=Value(delta))
+                      for pk, delta in ingredient_deltas.items()],
+                    default=Value(0),
+                    output_field=models.IntegerField()
+                ))
+            self.bulk_create([
+                self.model(
+                    user_id=user_id, ingredient_id=pk, amount=delta
+                )
+                for user_id in user_ids
+                for pk, delta in ingredient_deltas.items()
+                if delta > 0 and (user_id, pk) not in existing
+            ])
+            self.filter(
+                user_id__in=user_ids, amount__lte=0
+            ).delete()
+
+    def get_cart_user_ids(self, recipe_id):
+        return list(Recipe.shopping_users.through.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True))
+
+    def add_recipe(self, user_ids, recipe_id, sign=1):
+        """Add ingredients of the recipe to the shopping lists
+        (or subtract them if 'sign' is -1).
+        """
+        amounts = IngredientRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values('ingredient_id').annotate(total=Sum('amount'))
+        self.apply_delta(user_ids, {
+            row['ingredient_id']: sign * row['total'] for row in amounts
+        })
+
+    def aggregate_from_carts(self):
+        """Return actual totals computed from the carts
+        as {(user_id, ingredient_id): amount}.
+        """
+        rows = Recipe.shopping_users.through.objects.filter(
+            recipe__ingredientrecipe__isnull=False
+        ).values(
+            'user_id', 'recipe__ingredientrecipe__ingredient_id'
+        ).annotate(
+            total=Sum('recipe__ingredientrecipe__amount')
+        ).order_by()
+        return {
+            (row['user_id'], row['recipe__ingredientrecipe__ingredient_id']):
+                row['total']
+            for row in rows
+        }
+
+
+class ShoppingCartIngredient(models.Model):
+    """Class that represents materialized total amount of the ingredient
+    in the user's shopping cart.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество'
+    )
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
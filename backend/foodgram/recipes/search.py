@@ -0,0 +1,219 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Ingredient, IngredientRecipe, Recipe
+
+RECIPE_TABLE = Recipe._meta.db_table
+INGREDIENT_TABLE = Ingredient._meta.db_table
+INGREDIENT_RECIPE_TABLE = IngredientRecipe._meta.db_table
+SEARCH_TABLE = f'{RECIPE_TABLE}_fts'
+SEARCH_COLUMN = 'search_vector'
+SEARCH_INDEX = 'recipe_search_vector_idx'
+WORD_RE = re.compile(r'\w+')
+
+
+def fold_sql(column):
+    """SQL expression replacing 'ё' with 'е', neither FTS5 tokenizer
+    nor PostgreSQL russian configuration treat them as the same letter.
+    """
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def fold_query(query):
+    return query.replace('ё', 'е').replace('Ё', 'Е')
+
+
+# Space separated names of the recipe ingredients.
+INGREDIENT_NAMES_SQL = (
+    f'SELECT {{aggregate}} FROM {INGREDIENT_RECIPE_TABLE} ir '
+    f'JOIN {INGREDIENT_TABLE} i ON i.id = ir.ingredient_id '
+    f'WHERE ir.recipe_id = r.id'
+)
+
+
+class PostgresSearchBackend:
+    """Stored weighted tsvector column with GIN index: name has
+    the highest weight, then ingredient names, then the text.
+    """
+    config = 'russian'
+
+    def install(self, cursor):
+        cursor.execute(
+            f'ALTER TABLE {RECIPE_TABLE} '
+            f'ADD COLUMN IF NOT EXISTS {SEARCH_COLUMN} tsvector'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} '
+            f'ON {RECIPE_TABLE} USING GIN ({SEARCH_COLUMN})'
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX}')
+        cursor.execute(
+            f'ALTER TABLE {RECIPE_TABLE} DROP COLUMN IF EXISTS {SEARCH_COLUMN}'
+        )
+
+    def update(self, cursor, recipe_ids=None):
+        names = INGREDIENT_NAMES_SQL.format(
+            aggregate="string_agg(i.name, ' ')"
+        )
+        documents = [
+            (fold_sql(f"coalesce({column}, '')"), weight)
+            for column, weight in (
+                ('r.name', 'A'), (f'({names})', 'B'), ('r.text', 'C')
+            )
+        ]
+        vector = ' || '.join(
+            f"setweight(to_tsvector(%s, {document}), '{weight}')"
+            for document, weight in documents
+        )
+        sql = f'UPDATE {RECIPE_TABLE} r SET {SEARCH_COLUMN} = {vector}'
+        params = [self.config] * 3
+        if recipe_ids is not None:
+            sql += ' WHERE r.id = ANY(%s)'
+            params.append(list(recipe_ids))
+        cursor.execute(sql, params)
+
+    def remove(self, cursor, recipe_ids):
+        # Vector is stored in the recipe row and is deleted with it.
+        pass
+
+    def search(self, queryset, query):
+        tsquery = 'websearch_to_tsquery(%s, %s)'
+        params = [self.config, fold_query(query)]
+        return queryset.filter(RawSQL(
+            f'{RECIPE_TABLE}.{SEARCH_COLUMN} @@ {tsquery}',
+            params,
+            output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank_cd({RECIPE_TABLE}.{SEARCH_COLUMN}, {tsquery})',
+            params,
+            output_field=FloatField()
+        ))
+
+
+class SQLiteSearchBackend:
+    """FTS5 shadow table with the recipe id as rowid. Stemming
+    is not available, so every word of the query is a prefix.
+    """
+    # Column weights for bm25(): name, ingredients, text.
+    weights = (10.0, 4.0, 1.0)
+
+    def install(self, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            f'name, ingredients, text, '
+            f'tokenize="unicode61 remove_diacritics 2")'
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def update(self, cursor, recipe_ids=None):
+        names = INGREDIENT_NAMES_SQL.format(
+            aggregate="group_concat(i.name, ' ')"
+        )
+        sql = (
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, ingredients, text) '
+            f'SELECT r.id, {fold_sql("r.name")}, {fold_sql(f"({names})")}, '
+            f'{fold_sql("r.text")} FROM {RECIPE_TABLE} r'
+        )
+        if recipe_ids is None:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(sql)
+            return
+        recipe_ids = list(recipe_ids)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        self.remove(cursor, recipe_ids)
+        cursor.execute(f'{sql} WHERE r.id IN ({placeholders})', recipe_ids)
+
+    def remove(self, cursor, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})',
+            recipe_ids
+        )
+
+    def search(self, queryset, query):
+        words = WORD_RE.findall(fold_query(query))
+        if not words:
+            return queryset.annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            ).none()
+        match = ' '.join(f'"{word}"*' for word in words)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s',
+            [match]
+        )).annotate(search_rank=RawSQL(
+            # bm25() is lower for better matches.
+            f'SELECT -bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = {RECIPE_TABLE}.id',
+            [match],
+            output_field=FloatField()
+        ))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend(),
+    'sqlite': SQLiteSearchBackend(),
+}
+
+
+def get_backend(using=connection):
+    return BACKENDS.get(using.vendor)
+
+
+def install_search_index(using=connection):
+    """Create the full-text index structures and fill them."""
+    backend = get_backend(using)
+    if backend is not None:
+        with using.cursor() as cursor:
+            backend.install(cursor)
+            backend.update(cursor)
+
+
+def uninstall_search_index(using=connection):
+    backend = get_backend(using)
+    if backend is not None:
+        with using.cursor() as cursor:
+            backend.uninstall(cursor)
+
+
+def update_search_index(recipe_ids=None):
+    """Reindex given recipes or all of them if ids are not passed."""
+    backend = get_backend()
+    if backend is None or recipe_ids is not None and not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        backend.update(cursor, recipe_ids)
+
+
+def remove_from_search_index(recipe_ids):
+    backend = get_backend()
+    if backend is not None and recipe_ids:
+        with connection.cursor() as cursor:
+            backend.remove(cursor, recipe_ids)
+
+
+def schedule_search_update(recipe_ids):
+    """Reindex recipes after commit, when their ingredients are saved."""
+    recipe_ids = set(recipe_ids)
+    transaction.on_commit(lambda: update_search_index(recipe_ids))
+
+
+def search_recipes(queryset, query):
+    """Filter recipes by the full-text query and annotate them
+    with 'search_rank', higher rank means better match.
+    """
+    backend = get_backend()
+    if backend is not None:
+        return backend.search(queryset, query)
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
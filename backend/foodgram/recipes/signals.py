@@ -0,0 +1,281 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from core.versions import CATALOGUE_VERSION, RECIPES_VERSION, bump_version
+from users.models import User
+from .autocomplete import ingredient_index
+from .counters import update_tags_masks
+from .images import schedule_image_processing, schedule_renditions_deletion
+from .models import (Ingredient, IngredientRecipe, Recipe,
+                     ShoppingCartIngredient, Tag, TagRecipe)
+from .search import remove_from_search_index, schedule_search_update
+
+
+def get_m2m_change(sender, instance, action, reverse, pk_set, fields):
+    """Return sign and pks of related objects changed by m2m_changed
+    signal or None. 'fields' are names of through model fields
+    pointing to the forward and to the related side.
+    """
+    own_field, related_field = fields if not reverse else fields[::-1]
+    if action in ('pre_remove', 'pre_clear'):
+        # pk_set of remove() is what was requested, not what is deleted.
+        # Rows to delete are locked, so a concurrent removal of them
+        # waits for this transaction and then finds nothing to count.
+        rows = sender.objects.select_for_update().filter(
+            **{own_field: instance.pk}
+        )
+        if action == 'pre_remove':
+            rows = rows.filter(**{f'{related_field}__in': pk_set})
+        if not hasattr(instance, '_m2m_removed_pks'):
+            instance._m2m_removed_pks = dict()
+        instance._m2m_removed_pks[sender] = set(
+            rows.values_list(related_field, flat=True)
+        )
+        return None
+    if action in ('post_remove', 'post_clear'):
+        pk_set = getattr(instance, '_m2m_removed_pks', {}).pop(sender, None)
+        return (-1, pk_set) if pk_set else None
+    if action != 'post_add' or not pk_set:
+        return None
+    return 1, pk_set
+
+
+def update_counter(model, field, instance, pk_set, sign, on_instance):
+    """Shift the counter atomically: on the instance by the number
+    of changed relations or on every related object by one.
+    """
+    if on_instance:
+        model.objects.filter(pk=instance.pk).update(
+            **{field: F(field) + sign * len(pk_set)}
+        )
+    else:
+        model.objects.filter(pk__in=pk_set).update(
+            **{field: F(field) + sign}
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.shopping_users.through)
+def shopping_cart_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Keep shopping lists and counters in sync while recipes
+    are added to or removed from the shopping carts.
+    """
+    change = get_m2m_change(
+        sender, instance, action, reverse, pk_set, ('recipe_id', 'user_id')
+    )
+    if change is None:
+        return
+    sign, pk_set = change
+    update_counter(
+        Recipe, 'shopping_count', instance, pk_set, sign, not reverse
+    )
+    if not reverse:
+        ShoppingCartIngredient.objects.add_recipe(pk_set, instance.pk, sign)
+        return
+    for recipe_id in pk_set:
+        ShoppingCartIngredient.objects.add_recipe(
+            [instance.pk], recipe_id, sign
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.favorited_users.through)
+def favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    change = get_m2m_change(
+        sender, instance, action, reverse, pk_set, ('recipe_id', 'user_id')
+    )
+    if change is not None:
+        update_counter(
+            Recipe, 'favorites_count', instance, change[1], change[0],
+            not reverse
+        )
+
+
+@receiver(m2m_changed, sender=User.subscriptions.through)
+def subscriptions_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    change = get_m2m_change(
+        sender, instance, action, reverse, pk_set,
+        ('from_user_id', 'to_user_id')
+    )
+    if change is not None:
+        # Counter belongs to the followed user, that is the related
+        # side of the forward relation.
+        update_counter(
+            User, 'subscribers_count', instance, change[1], change[0],
+            reverse
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Relations of the user are deleted by cascade without m2m signals.
+    Recipe.objects.filter(favorited_users=instance).update(
+        favorites_count=F('favorites_count') - 1
+    )
+    Recipe.objects.filter(shopping_users=instance).update(
+        shopping_count=F('shopping_count') - 1
+    )
+    User.objects.filter(subscribers=instance).update(
+        subscribers_count=F('subscribers_count') - 1
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # Cart rows are still in place on pre_delete. Changes of
+    # ingredients of existing recipes are synced by RecipeSerializer.
+    ShoppingCartIngredient.objects.add_recipe(
+        ShoppingCartIngredient.objects.get_cart_user_ids(instance.pk),
+        instance.pk,
+        -1
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    # Bit of the tag is freed for new tags, so it's cleared on
+    # recipes before the links are deleted by cascade.
+    Recipe.objects.alias(
+        tag_bit=F('tags_mask').bitand(instance.mask)
+    ).exclude(tag_bit=0).update(
+        tags_mask=F('tags_mask').bitand(~instance.mask)
+    )
+
+
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+def recipe_tag_changed(sender, instance, **kwargs):
+    update_tags_masks(Recipe, [instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=TagRecipe)
+def recipe_tags_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # add() creates links in bulk, removed ones send post_delete.
+    if action == 'post_add' and pk_set:
+        update_tags_masks(Recipe, pk_set if reverse else [instance.pk])
+        bump_recipes_version()
+
+
+@receiver(pre_save, sender=Recipe)
+def reset_image_renditions(sender, instance, **kwargs):
+    previous_image, previous_renditions = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('image', 'image_renditions').first() or (None, None)
+    instance._image_changed = previous_image != instance.image.name
+    if instance._image_changed:
+        # Serializers fall back to the original image until
+        # new renditions are ready.
+        instance.image_renditions = dict()
+        schedule_renditions_deletion(previous_renditions)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_renditions(sender, instance, **kwargs):
+    schedule_renditions_deletion(instance.image_renditions)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if getattr(instance, '_image_changed', False) and instance.image:
+        schedule_image_processing(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalogue_changed(sender, **kwargs):
+    transaction.on_commit(partial(bump_version, CATALOGUE_VERSION))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    # Ingredients are written in bulk after the recipe, so
+    # the recipe is reindexed when the transaction is committed.
+    schedule_search_update([instance.pk])
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    # Single writes of the admin and scripts, bulk ones
+    # are followed by the recipe save.
+    schedule_search_update([instance.recipe_id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_removed(sender, instance, **kwargs):
+    remove_from_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_update(IngredientRecipe.objects.filter(
+            ingredient=instance
+        ).values_list('recipe_id', flat=True))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    # Recipe links are deleted by cascade, reindex affected recipes.
+    ingredient_renamed(sender, instance, created=False)
+
+
+# User fields shown as the recipe author.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def bump_recipes_version():
+    # Bumped after commit, otherwise concurrent request could cache
+    # the old data under the new version.
+    transaction.on_commit(partial(bump_version, RECIPES_VERSION))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def recipes_changed(sender, **kwargs):
+    bump_recipes_version()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    # Logins update only 'last_login' and don't affect recipes.
+    if not created and (
+            update_fields is None or AUTHOR_FIELDS & set(update_fields)
+    ):
+        bump_recipes_version()
@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from api.tests.fixtures import create_recipes, create_user
+from users.models import User
+
+
+class AdminQueriesTest(TestCase):
+    """Number of queries of changelists doesn't depend on the number
+    of rows in the tables.
+    """
+    # Session, user, tags of the filter, page count, rows.
+    RECIPE_CHANGELIST_QUERIES = 5
+    # Session, user, measures of the filter, page count, rows.
+    INGREDIENT_CHANGELIST_QUERIES = 5
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(
+            email='admin@foodgram.ru', username='admin', password='admin',
+            first_name='Имя', last_name='Фамилия'
+        ))
+
+    def assert_budget(self, url, queries):
+        for authors_number in (1, 10):
+            for _ in range(authors_number):
+                create_recipes(create_user(User.objects.count()), 2)
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_recipe_changelist(self):
+        self.assert_budget(
+            '/admin/recipes/recipe/', self.RECIPE_CHANGELIST_QUERIES
+        )
+
+    def test_recipe_search(self):
+        self.assert_budget(
+            '/admin/recipes/recipe/?q=Рецепт', self.RECIPE_CHANGELIST_QUERIES
+        )
+
+    def test_recipe_author_filter(self):
+        self.assert_budget(
+            '/admin/recipes/recipe/?author=user1',
+            self.RECIPE_CHANGELIST_QUERIES
+        )
+
+    def test_ingredient_search(self):
+        self.assert_budget(
+            '/admin/recipes/ingredient/?q=Ингредиент',
+            self.INGREDIENT_CHANGELIST_QUERIES
+        )
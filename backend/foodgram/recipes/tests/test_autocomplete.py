@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from recipes.autocomplete import IngredientIndex
+from recipes.models import Ingredient
+
+
+class IngredientIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measure='г')
+            for name in ('картофель', 'молодой картофель', 'ёжевика')
+        ])
+
+    def test_prefix_matches_go_first(self):
+        found = IngredientIndex().search('картоф')
+        self.assertEqual(
+            [ingredient.name for ingredient in found],
+            ['картофель', 'молодой картофель']
+        )
+
+    def test_snapshot_survives_invalidation(self):
+        index = IngredientIndex()
+        snapshot = index._get_snapshot()
+        index.invalidate()
+        # A search which has read the snapshot keeps using it whole.
+        self.assertEqual(len(snapshot[2]), 3)
+        Ingredient.objects.create(name='ежевичный джем', measure='г')
+        self.assertEqual(len(index.search('ежев')), 2)
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.fixtures import create_recipes, create_user
+from core.versions import RECIPES_VERSION, get_version
+from recipes.counters import reconcile_counters
+from recipes.models import Recipe, ShoppingCartIngredient
+from users.models import User
+
+
+class CountersTest(APITestCase):
+    """Counters and shopping lists change by the relations really
+    added or removed, not by the requested ones.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.reader = create_user(2)
+        cls.recipe, cls.other_recipe = create_recipes(cls.author, 2)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        return (
+            recipe.favorites_count, recipe.shopping_count,
+            author.subscribers_count
+        )
+
+    def test_repeated_remove(self):
+        self.recipe.favorited_users.add(self.reader)
+        self.recipe.shopping_users.add(self.reader)
+        self.reader.recipe_set.add(self.other_recipe)
+        self.reader.subscriptions.add(self.author)
+        for _ in range(2):
+            self.recipe.favorited_users.remove(self.reader)
+            self.recipe.shopping_users.remove(self.reader)
+            self.reader.subscriptions.remove(self.author)
+        self.assertEqual(self.get_counters(), (0, 0, 0))
+        self.assertEqual(
+            set(ShoppingCartIngredient.objects.filter(
+                user=self.reader
+            ).values_list('amount', flat=True)),
+            {5}
+        )
+
+    def test_remove_of_missing_relation(self):
+        self.recipe.favorited_users.add(self.reader)
+        self.reader.favorited.remove(self.recipe, self.other_recipe)
+        self.reader.recipe_set.remove(self.recipe)
+        self.assertEqual(self.get_counters(), (0, 0, 0))
+        self.assertFalse(
+            ShoppingCartIngredient.objects.filter(user=self.reader).exists()
+        )
+
+    def test_clear(self):
+        self.reader.recipe_set.add(self.recipe, self.other_recipe)
+        self.reader.recipe_set.clear()
+        self.reader.recipe_set.clear()
+        self.assertEqual(self.get_counters(), (0, 0, 0))
+        self.assertFalse(
+            ShoppingCartIngredient.objects.filter(user=self.reader).exists()
+        )
+
+    def test_reconcile_drops_cached_recipes(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(favorites_count=3)
+        version = get_version(RECIPES_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            reconcile_counters(Recipe, User)
+        self.assertEqual(self.get_counters(), (0, 0, 0))
+        self.assertNotEqual(get_version(RECIPES_VERSION), version)
+
+    def test_save_keeps_counters(self):
+        reader = User.objects.get(pk=self.reader.pk)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.recipe.favorited_users.add(self.reader)
+        self.reader.subscriptions.add(self.author)
+        create_recipes(self.reader, 1)
+        reader.first_name = 'Другое имя'
+        reader.save()
+        recipe.text = 'Другое описание'
+        recipe.save()
+        reader.refresh_from_db()
+        self.assertEqual(reader.first_name, 'Другое имя')
+        self.assertEqual(reader.recipes_count, 1)
+        self.assertEqual(self.get_counters(), (1, 0, 1))
+
+    def test_password_change_keeps_counters(self):
+        user = create_user(3, password='old-password')
+        create_recipes(user, 1)
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'old-password',
+            'new_password': 'new-password',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(pk=user.pk).recipes_count, 1)
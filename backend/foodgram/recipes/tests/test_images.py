@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.images import (RENDITIONS_DIR, delete_orphan_renditions,
+                            iterate_renditions, process_recipe_image)
+from recipes.models import Recipe
+from users.models import User
+
+
+def make_image(name):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), 'orange').save(buffer, 'PNG')
+    return default_storage.save(
+        f'recipes/images/{name}.png', ContentFile(buffer.getvalue())
+    )
+
+
+class RenditionsCleanupTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Имя', last_name='Фамилия'
+        )
+        with self.captureOnCommitCallbacks():
+            self.recipe = Recipe.objects.create(
+                author=author, name='Рецепт', text='Описание',
+                cooking_time=10, image=make_image('first')
+            )
+        process_recipe_image(self.recipe.pk, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+        self.renditions = list(iterate_renditions(
+            self.recipe.image_renditions
+        ))
+
+    def assert_deleted(self, names):
+        for name in names:
+            self.assertFalse(default_storage.exists(name), name)
+
+    def test_reprocessing_overwrites_renditions(self):
+        process_recipe_image(self.recipe.pk, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            list(iterate_renditions(self.recipe.image_renditions)),
+            self.renditions
+        )
+        self.assertEqual(
+            len(default_storage.listdir(RENDITIONS_DIR)[1]),
+            len(self.renditions)
+        )
+
+    # Processing of the new image in the background is not tested here.
+    @mock.patch('recipes.signals.schedule_image_processing')
+    def test_image_change_deletes_renditions(self, schedule):
+        self.recipe.image = make_image('second')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.assert_deleted(self.renditions)
+
+    def test_recipe_deletion_deletes_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assert_deleted(self.renditions)
+
+    def test_orphans_are_deleted(self):
+        Recipe.objects.update(image_renditions={})
+        self.assertEqual(
+            delete_orphan_renditions(min_age=timedelta(0)),
+            len(self.renditions)
+        )
+        self.assert_deleted(self.renditions)
@@ -0,0 +1,78 @@
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from api.tests.fixtures import create_user
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 index of SQLite')
+class RecipeSearchTest(APITestCase):
+    """Full-text search of recipes on the SQLite FTS5 index."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('recipes.signals.schedule_image_processing')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = create_user(1)
+        self.beet = Ingredient.objects.create(name='свёкла', measure='г')
+        self.borscht = self.create_recipe(
+            'Борщ', 'Варить два часа.', [self.beet]
+        )
+        self.salad = self.create_recipe(
+            'Салат', 'Подавать с борщом или без.', []
+        )
+
+    def create_recipe(self, name, text, ingredients):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author, name=name, text=text, cooking_time=10,
+                image='recipes/images/recipe.png'
+            )
+            IngredientRecipe.objects.bulk_create([
+                IngredientRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients
+            ])
+        return recipe
+
+    def search(self, query):
+        cache.clear()
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(
+            self.search('борщ'), [self.borscht.pk, self.salad.pk]
+        )
+
+    def test_ingredient_names(self):
+        self.assertEqual(self.search('свекла'), [self.borscht.pk])
+
+    def test_yo_folding(self):
+        self.assertEqual(self.search('свёкл'), [self.borscht.pk])
+        self.assertEqual(self.search('ВАРИТЬ'), [self.borscht.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search('пирог'), [])
+
+    def test_ingredient_written_outside_serializer(self):
+        onion = Ingredient.objects.create(name='лук', measure='г')
+        with self.captureOnCommitCallbacks(execute=True):
+            link = IngredientRecipe.objects.create(
+                recipe=self.salad, ingredient=onion, amount=1
+            )
+        self.assertEqual(self.search('лук'), [self.salad.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            link.delete()
+        self.assertEqual(self.search('лук'), [])
+
+    def test_deleted_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.borscht.delete()
+        self.assertEqual(self.search('борщ'), [self.salad.pk])
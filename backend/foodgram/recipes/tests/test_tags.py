@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api.tests.fixtures import create_recipes, create_user
+from recipes.models import Recipe, Tag, TagRecipe
+
+
+class TagsMaskTest(APITestCase):
+    """Recipes are found by tags however their tags are written."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipes = create_recipes(create_user(1), 2, tags_number=1)
+        cls.tag = Tag.objects.get()
+        cls.other_tag = Tag.objects.create(
+            name='Ужин', color='#8775D2', slug='dinner'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def filter_by_tag(self, tag):
+        cache.clear()
+        response = self.client.get('/api/recipes/', {'tags': tag.slug})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_fixture_recipes(self):
+        self.assertEqual(
+            self.filter_by_tag(self.tag),
+            {recipe.pk for recipe in self.recipes}
+        )
+        self.assertEqual(self.filter_by_tag(self.other_tag), set())
+
+    def test_single_link_writes(self):
+        recipe = self.recipes[0]
+        link = TagRecipe.objects.create(recipe=recipe, tag=self.other_tag)
+        self.assertEqual(self.filter_by_tag(self.other_tag), {recipe.pk})
+        link.delete()
+        self.assertEqual(self.filter_by_tag(self.other_tag), set())
+
+    def test_relation_add_and_remove(self):
+        recipe = self.recipes[1]
+        recipe.tags.add(self.other_tag)
+        self.other_tag.recipe_set.add(self.recipes[0])
+        self.assertEqual(
+            self.filter_by_tag(self.other_tag),
+            {recipe.pk for recipe in self.recipes}
+        )
+        recipe.tags.remove(self.other_tag)
+        self.other_tag.recipe_set.clear()
+        self.assertEqual(self.filter_by_tag(self.other_tag), set())
+
+    def test_stale_save_keeps_mask(self):
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        recipe.tags.add(self.other_tag)
+        stale = self.recipes[0]
+        stale.text = 'Другое описание'
+        stale.save()
+        self.assertEqual(
+            self.filter_by_tag(self.other_tag), {self.recipes[0].pk}
+        )
+
+    def test_recipe_update(self):
+        recipe = self.recipes[0]
+        self.client.force_authenticate(recipe.author)
+        response = self.client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {'tags': [self.other_tag.pk]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.filter_by_tag(self.other_tag), {recipe.pk})
+        self.assertEqual(self.filter_by_tag(self.tag), {self.recipes[1].pk})
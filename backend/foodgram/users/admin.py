@@ -6,7 +6,9 @@ from .models import User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ['email', 'username']
-    search_fields = ['email', 'username']
-    list_filter = ['email', 'username']
+    list_display = ['email', 'username', 'recipes_count', 'subscribers_count']
+    search_fields = ['=email', '^username']
+    list_filter = ['is_active', 'is_staff']
+    readonly_fields = ['recipes_count', 'subscribers_count']
     form = MyUserForm
+    show_full_result_count = False
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from core.indexes import upper_pattern_index
+
+
+class Migration(migrations.Migration):
+    """Indexes of '=email', '^username' admin search of users
+    and '=author__username', '=author__email' one of recipes.
+    """
+
+    dependencies = [
+        ('users', '0006_user_counters'),
+    ]
+
+    operations = [
+        upper_pattern_index(
+            'users.User', 'username', 'user_username_upper_like_idx'
+        ),
+        upper_pattern_index(
+            'users.User', 'email', 'user_email_upper_like_idx'
+        ),
+    ]
@@ -2,8 +2,10 @@ from django.contrib.auth.models import AbstractUser
 from django.core import validators
 from django.db import models
 
+from core.models import CountersMixin
 
-class User(AbstractUser):
+
+class User(CountersMixin, AbstractUser):
     """Class that represents User model."""
     email = models.EmailField(
         unique=True,
@@ -26,6 +28,14 @@ class User(AbstractUser):
         related_name='subscribers',
         symmetrical=False
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
 
     class Meta:
         ordering = ['email']
@@ -33,6 +43,7 @@ class User(AbstractUser):
         verbose_name_plural = 'Пользователи'
 
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', ]
+    counter_fields = ('recipes_count', 'subscribers_count')
     USERNAME_FIELD = 'email'
 
     def __str__(self):
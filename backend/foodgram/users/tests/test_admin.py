@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from api.tests.fixtures import create_user
+from users.models import User
+
+
+class AdminQueriesTest(TestCase):
+    """Number of queries of the users changelist doesn't depend
+    on the number of users.
+    """
+    # Session, user, page count, rows.
+    USER_CHANGELIST_QUERIES = 4
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(
+            email='admin@foodgram.ru', username='admin', password='admin',
+            first_name='Имя', last_name='Фамилия'
+        ))
+
+    def test_user_search(self):
+        for users_number in (1, 10):
+            for _ in range(users_number):
+                create_user(User.objects.count())
+            for query in ('user', 'user1@foodgram.ru'):
+                with self.assertNumQueries(self.USER_CHANGELIST_QUERIES):
+                    response = self.client.get(
+                        '/admin/users/user/', {'q': query}
+                    )
+                self.assertEqual(response.status_code, 200)